@@ -1,4 +1,6 @@
-from flask import Flask, request, jsonify
+import logging
+import time
+from flask import Flask, request, jsonify, g
 from modules import (
     faculty_handler,
     labs_handler,
@@ -6,16 +8,83 @@ from modules import (
     class_structure_handler,
     subjects_handler,
     workload_handler,
-    constraints_handler
+    constraints_handler,
+    import_handler,
+    export_handler,
+    time_grid_handler,
+    health_handler,
+    logging_setup,
+    tenancy
 )
 
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 
+
+# ---------- REQUEST CONTEXT (correlation id, debug trace) ----------
+@app.before_request
+def bind_request_context():
+    headers = request.headers
+    request_id = (logging_setup.clean_request_id(headers.get(logging_setup.REQUEST_ID_HEADER))
+                  or logging_setup.new_request_id())
+    trace = logging_setup.sample_trace(headers.get(logging_setup.TRACE_HEADER, '').lower() in ('1', 'true'))
+    g.log_tokens = logging_setup.bind(request_id, trace)
+    g.started = time.perf_counter()
+
+
+# ---------- REQUEST CONTEXT (department) ----------
+@app.before_request
+def bind_department():
+    body = request.get_json(silent=True)
+    try:
+        department = tenancy.resolve(
+            request.headers.get(tenancy.DEPARTMENT_HEADER),
+            request.args.get('department'),
+            (body.get('department') if isinstance(body, dict) else None) or request.form.get('department')
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    g.department_token = tenancy.bind(department)
+
+
+@app.after_request
+def log_request(response):
+    response.headers[logging_setup.REQUEST_ID_HEADER] = logging_setup.request_id()
+    logger.info(
+        "%s %s %d", request.method, request.path, response.status_code,
+        extra={
+            'duration_ms': round((time.perf_counter() - g.started) * 1000, 2),
+            'department': tenancy.current_department()
+        }
+    )
+    return response
+
+
+@app.teardown_request
+def reset_request_context(exc):
+    department_token = g.pop('department_token', None)
+    if department_token:
+        tenancy.reset(department_token)
+    tokens = g.pop('log_tokens', None)
+    if tokens:
+        logging_setup.reset(tokens)
+
+
 @app.route('/')
 def home():
     return jsonify({"message": "Flask Timetable API is running!"})
 
 
+# ---------- HEALTH CHECK ----------
+@app.route('/health', methods=['GET'])
+def health():
+    """
+    Database latency and connection pool utilisation
+    """
+    return health_handler.check_health()
+
+
 # ---------- FACULTY ----------
 @app.route('/api/faculty', methods=['GET', 'POST', 'PUT', 'DELETE'])
 def handle_faculty():
@@ -37,6 +106,17 @@ def handle_faculty():
         return jsonify({"error": "Invalid action"}), 400
 
 
+# ---------- FACULTY (BULK) ----------
+@app.route('/api/faculty/bulk', methods=['POST'])
+def handle_faculty_bulk():
+    """
+    Add, update or delete many faculties at once
+    Body: {"action": "add", "faculties": [{"name": "...", "short_name": "..."}]}
+    """
+    data = request.json or {}
+    return faculty_handler.bulk_faculty(data)
+
+
 # ---------- LABS ----------
 @app.route('/api/labs', methods=['GET', 'POST', 'PUT', 'DELETE'])
 def handle_labs():
@@ -58,6 +138,17 @@ def handle_labs():
         return jsonify({"error": "Invalid action"}), 400
 
 
+# ---------- LABS (BULK) ----------
+@app.route('/api/labs/bulk', methods=['POST'])
+def handle_labs_bulk():
+    """
+    Add, update or delete many labs at once
+    Body: {"action": "add", "labs": [{"name": "...", "short_name": "..."}]}
+    """
+    data = request.json or {}
+    return labs_handler.bulk_labs(data)
+
+
 # ---------- PREVIOUS YEAR TIMETABLE ----------
 @app.route('/api/previous_timetable', methods=['POST'])
 def previous_timetable():
@@ -66,10 +157,17 @@ def previous_timetable():
 
 
 # ---------- CLASS STRUCTURE ----------
-@app.route('/api/class_structure', methods=['POST'])
+@app.route('/api/class_structure', methods=['GET', 'POST'])
 def save_class_structure():
+    """
+    GET returns the structure and its version as the ETag; send it back in
+    If-Match on POST to reject the save (412) if someone else saved first
+    """
+    if request.method == 'GET':
+        return class_structure_handler.get_class_structure()
+
     data = request.json
-    return class_structure_handler.save_class_structure(data)
+    return class_structure_handler.save_class_structure(data, request.headers.get('If-Match'))
 
 
 # ---------- CONFIRM LABS ----------
@@ -80,17 +178,90 @@ def confirm_labs():
 
 
 # ---------- SAVE SUBJECTS ----------
-@app.route('/api/subjects', methods=['POST'])
+@app.route('/api/subjects', methods=['GET', 'POST'])
 def save_subjects():
+    """
+    GET returns the subjects and their version as the ETag; send it back in
+    If-Match on POST to reject the save (412) if someone else saved first
+    """
+    if request.method == 'GET':
+        return subjects_handler.get_subjects()
+
     data = request.json
-    return subjects_handler.save_subjects(data)
+    return subjects_handler.save_subjects(data, request.headers.get('If-Match'))
 
 
 # ---------- SAVE FACULTY WORKLOAD ----------
-@app.route('/api/faculty_workload', methods=['POST'])
+@app.route('/api/faculty_workload', methods=['GET', 'POST'])
 def save_workload():
+    """
+    GET ?faculty_name=... returns that workload and its version as the ETag
+    (all workloads without the parameter); POST honours If-Match
+    """
+    if request.method == 'GET':
+        return workload_handler.get_faculty_workload(request.args.get('faculty_name'))
+
     data = request.json
-    return workload_handler.save_faculty_workload(data)
+    return workload_handler.save_faculty_workload(data, request.headers.get('If-Match'))
+
+
+# ---------- SAVE FACULTY WORKLOAD (BULK) ----------
+@app.route('/api/faculty_workload/bulk', methods=['POST'])
+def save_workload_bulk():
+    """
+    Save workloads for many faculties at once
+    Body: {"workloads": [{"faculty_name": "...", "subjects": [...]}]}
+    """
+    data = request.json or {}
+    return workload_handler.save_bulk_faculty_workload(data)
+
+
+# ---------- IMPORT CSV / XLSX ----------
+@app.route('/api/import/<target>', methods=['POST'])
+def import_data(target):
+    """
+    Stream a CSV or XLSX upload into subjects, class_structure or workload
+    Form data: file=<upload>, optional format=csv|xlsx
+    """
+    return import_handler.import_file(target, request.files.get('file'), request.form.get('format'))
+
+
+# ---------- EXPORT MASTER TIMETABLE ----------
+@app.route('/api/export/<file_format>', methods=['GET'])
+def export_timetable(file_format):
+    """
+    Stream a master timetable as csv, xlsx or ics
+    Query: ?year=SY&sem=1&view=lab|faculty|division&name=...
+    """
+    return export_handler.export_timetable(file_format.lower(), request.args)
+
+
+# ---------- TIME GRID ----------
+@app.route('/api/time_grid', methods=['GET', 'POST'])
+def handle_time_grid():
+    """
+    Read or save the teaching days and slot start times
+    Body: {"days": ["Monday", ...], "slots": ["11:15", "14:15", "16:20"]}
+    """
+    if request.method == 'GET':
+        return time_grid_handler.get_time_grid()
+
+    data = request.json or {}
+    return time_grid_handler.save_time_grid(data)
+
+
+# ---------- AVAILABILITY CALENDARS ----------
+@app.route('/api/availability', methods=['GET', 'POST'])
+def handle_availability():
+    """
+    Read or replace lab/faculty unavailability calendars
+    Body: {"calendars": [{"resource_type": "lab", "name": "Lab 1", "unavailable": [{"day": "Friday"}]}]}
+    """
+    if request.method == 'GET':
+        return time_grid_handler.get_availability()
+
+    data = request.json or {}
+    return time_grid_handler.save_availability(data)
 
 
 # ---------- SAVE CONSTRAINTS ----------
@@ -107,17 +278,59 @@ def generate_timetable():
     return timetable_handler.generate_timetable(data)
 
 
+# ---------- FEASIBILITY PRE-CHECK ----------
+@app.route('/api/feasibility', methods=['POST'])
+def check_feasibility():
+    """
+    Report whether labs, faculty and periods can cover the practicals
+    Body: {"year": "SY", "sem": "1"}
+    """
+    data = request.json or {}
+    return timetable_handler.check_feasibility(data)
+
+
 # ---------- GENERATE ALL TIMETABLES (SY, TY, BE) ----------
 @app.route('/api/generate_all_timetables', methods=['POST'])
 def generate_all_timetables():
     """
     Generate master practical timetables for all classes (SY, TY, BE)
-    Body: {"sem": "1"}
+    Body: {"sem": "1", "backend": "backtracking" | "cpsat", "async": false}
     """
     data = request.json or {}
     return timetable_handler.generate_all_timetables(data)
 
 
+# ---------- WHAT-IF SIMULATION ----------
+@app.route('/api/simulate', methods=['POST'])
+def simulate():
+    """
+    Solve what-if scenarios (overlays on the current data) without saving
+    Body: {"sem": "1", "scenarios": [{"name": "...", "overlay": {...}}]}
+    """
+    data = request.json or {}
+    return timetable_handler.simulate(data)
+
+
+# ---------- GENERATION JOB STATUS ----------
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    """
+    Poll a generation job started with {"async": true}
+    """
+    return timetable_handler.get_generation_job(job_id)
+
+
+# ---------- TIMETABLE QUALITY METRICS ----------
+@app.route('/api/timetable_metrics', methods=['POST'])
+def get_timetable_metrics():
+    """
+    Utilisation, load balance, idle gaps, day spread and late slot usage
+    Body: {"year": "SY", "sem": "1"}
+    """
+    data = request.json or {}
+    return timetable_handler.get_timetable_metrics(data)
+
+
 # ---------- GET ALL MASTER TIMETABLES ----------
 @app.route('/api/master_timetables', methods=['GET'])
 def get_all_master_timetables():
@@ -138,5 +351,13 @@ def get_master_timetable():
     return timetable_handler.get_master_timetable(data)
 
 
+
+# ---------- STARTUP ----------
+# Indexes are ensured by the gunicorn master (gunicorn.conf.py on_starting)
+# or explicitly with 'python -m modules.indexes ensure'; importing the app
+# never touches the database
+logging_setup.configure_logging()
+
+
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, monitoring
 from dotenv import load_dotenv
 
 # Load environment variables from .env
@@ -8,6 +9,135 @@ load_dotenv()
 MONGO_URI = os.getenv("MONGO_URI")
 DB_NAME = os.getenv("DB_NAME")
 
-# Connect to MongoDB
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+# Connection pool settings (tune per Gunicorn worker)
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "0"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "30000"))
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Counts open and checked-out connections across all pools of this process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.open = 0
+        self.checked_out = 0
+
+    def _add(self, field, delta):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + delta)
+
+    def connection_created(self, event):
+        self._add('open', 1)
+
+    def connection_closed(self, event):
+        self._add('open', -1)
+
+    def connection_checked_out(self, event):
+        self._add('checked_out', 1)
+
+    def connection_checked_in(self, event):
+        self._add('checked_out', -1)
+
+    # Remaining pool events are not needed for the counters
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            return {"open": self.open, "checked_out": self.checked_out}
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+pool_stats = PoolStats()
+
+
+def get_client():
+    """
+    Return the process-wide MongoClient, creating it on first use.
+    A client inherited across fork() is not reused; each worker process
+    builds its own pool.
+    """
+    global _client, _client_pid, pool_stats
+
+    pid = os.getpid()
+    if _client is not None and _client_pid == pid:
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            pool_stats = PoolStats()
+            _client = MongoClient(
+                MONGO_URI,
+                connect=False,
+                maxPoolSize=MONGO_MAX_POOL_SIZE,
+                minPoolSize=MONGO_MIN_POOL_SIZE,
+                serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+                connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+                socketTimeoutMS=MONGO_SOCKET_TIMEOUT_MS,
+                event_listeners=[pool_stats]
+            )
+            _client_pid = pid
+
+    return _client
+
+
+def get_db():
+    return get_client()[DB_NAME]
+
+
+def get_pool_stats():
+    """Connection counters for the current process' client"""
+    stats = pool_stats.snapshot()
+    stats["max_pool_size"] = MONGO_MAX_POOL_SIZE
+    stats["utilisation"] = round(stats["checked_out"] / MONGO_MAX_POOL_SIZE, 3) if MONGO_MAX_POOL_SIZE else None
+    return stats
+
+
+class LazyCollection:
+    """Collection handle that resolves against the current process' client on every use"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __getattr__(self, attr):
+        return getattr(get_db()[self.name], attr)
+
+    def __getitem__(self, name):
+        return LazyCollection(f"{self.name}.{name}")
+
+
+class LazyDatabase:
+    """Stand-in for the Database object so modules can bind collections at import time"""
+
+    def __getitem__(self, name):
+        return LazyCollection(name)
+
+    def __getattr__(self, attr):
+        return getattr(get_db(), attr)
+
+
+# Importing config never opens a connection
+db = LazyDatabase()
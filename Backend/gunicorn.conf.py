@@ -0,0 +1,37 @@
+"""Gunicorn settings; every value can be overridden from the environment"""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+
+# Threaded workers: a request waiting on a generation job only blocks its own thread
+worker_class = "gthread"
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("WEB_THREADS", "8"))
+
+# Synchronous generation requests wait for the job pool, allow for long searches
+timeout = int(os.getenv("WEB_TIMEOUT", "600"))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the app once in the master; each worker builds its own MongoDB pool
+# and job pool after fork. Job pool processes are not forked from workers and
+# share one host-wide budget (JOB_WORKERS, GENERATION_CPUS), however many
+# workers there are
+preload_app = True
+
+accesslog = "-"
+errorlog = "-"
+
+
+def on_starting(server):
+    """
+    Ensure indexes once, in the master, before any worker is forked.
+    Raises (and so stops the server) if an index cannot be built.
+    Jobs this host left unfinished when it last stopped are marked failed.
+    """
+    from modules import indexes, job_runner, logging_setup
+
+    logging_setup.configure_logging()
+    indexes.ensure_indexes()
+    job_runner.fail_orphaned_jobs()
@@ -0,0 +1,155 @@
+"""
+Measure read endpoint latency while a timetable generation is running.
+
+Start the server first (gunicorn -c gunicorn.conf.py wsgi:app, which binds
+:8000; pass --base-url http://localhost:5000 for python app.py), then run:
+
+    python loadtest.py --base-url http://localhost:8000 --sem 1
+
+The script measures a baseline phase with only read traffic, then starts
+/api/generate_all_timetables and measures the same endpoints until the
+generation finishes (or --duration expires), printing p50/p99 per phase.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+READ_ENDPOINTS = [
+    '/api/faculty',
+    '/api/labs',
+    '/api/master_timetables',
+    '/health',
+]
+
+
+def _request(url, payload=None, timeout=600):
+    data = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        return response.status, response.read()
+
+
+def _percentile(values, percent):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _hammer(base_url, stop, latencies, errors, lock):
+    """Cycle through the read endpoints until stop is set"""
+    i = 0
+    while not stop.is_set():
+        endpoint = READ_ENDPOINTS[i % len(READ_ENDPOINTS)]
+        i += 1
+        started = time.perf_counter()
+        try:
+            _request(base_url + endpoint, timeout=30)
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                latencies.setdefault(endpoint, []).append(elapsed)
+        except (urllib.error.URLError, OSError) as e:
+            with lock:
+                errors.append(f"{endpoint}: {e}")
+
+
+def _run_phase(base_url, concurrency, until):
+    """Run readers until until() returns True; return (latencies, errors)"""
+    stop = threading.Event()
+    latencies, errors, lock = {}, [], threading.Lock()
+    readers = [
+        threading.Thread(target=_hammer, args=(base_url, stop, latencies, errors, lock), daemon=True)
+        for _ in range(concurrency)
+    ]
+    for reader in readers:
+        reader.start()
+
+    until()
+    stop.set()
+    for reader in readers:
+        reader.join()
+
+    return latencies, errors
+
+
+def _summarise(label, latencies, errors):
+    print(f"\n{label}")
+    print(f"{'endpoint':<28}{'requests':>10}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    all_values = []
+    for endpoint in READ_ENDPOINTS:
+        values = latencies.get(endpoint, [])
+        all_values.extend(values)
+        if values:
+            print(f"{endpoint:<28}{len(values):>10}{statistics.median(values):>10.1f}"
+                  f"{_percentile(values, 99):>10.1f}{max(values):>10.1f}")
+    if all_values:
+        print(f"{'all':<28}{len(all_values):>10}{statistics.median(all_values):>10.1f}"
+              f"{_percentile(all_values, 99):>10.1f}{max(all_values):>10.1f}")
+    if errors:
+        print(f"{len(errors)} errors, first: {errors[0]}")
+
+    return {
+        'requests': len(all_values),
+        'p50_ms': statistics.median(all_values) if all_values else None,
+        'p99_ms': _percentile(all_values, 99),
+        'errors': len(errors)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--base-url', default='http://localhost:8000', help="server to test (gunicorn binds :8000)")
+    parser.add_argument('--sem', default='1')
+    parser.add_argument('--backend', default='backtracking', choices=['backtracking', 'cpsat'])
+    parser.add_argument('--concurrency', type=int, default=8, help="parallel reader threads")
+    parser.add_argument('--baseline-seconds', type=float, default=10)
+    parser.add_argument('--duration', type=float, default=120, help="max seconds to wait for the generation")
+    parser.add_argument('--json', action='store_true', help="print the summary as JSON")
+    args = parser.parse_args()
+
+    base_url = args.base_url.rstrip('/')
+
+    baseline = _summarise(
+        f"Baseline ({args.baseline_seconds:.0f}s, reads only)",
+        *_run_phase(base_url, args.concurrency, lambda: time.sleep(args.baseline_seconds))
+    )
+
+    generation = {}
+
+    def generate():
+        started = time.perf_counter()
+        try:
+            status, body = _request(
+                base_url + '/api/generate_all_timetables',
+                {'sem': args.sem, 'backend': args.backend},
+                timeout=args.duration
+            )
+            generation.update(status=status, body=json.loads(body))
+        except (urllib.error.URLError, OSError) as e:
+            generation.update(error=str(e))
+        generation['seconds'] = time.perf_counter() - started
+
+    def until_generated():
+        worker = threading.Thread(target=generate, daemon=True)
+        worker.start()
+        worker.join(args.duration)
+
+    loaded = _summarise(
+        "During generation",
+        *_run_phase(base_url, args.concurrency, until_generated)
+    )
+
+    print(f"\nGeneration: {generation.get('status', generation.get('error'))} "
+          f"in {generation.get('seconds', 0):.2f}s")
+
+    if args.json:
+        print(json.dumps({'baseline': baseline, 'during_generation': loaded, 'generation': generation}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
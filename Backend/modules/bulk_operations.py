@@ -0,0 +1,206 @@
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from modules import tenancy
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def _item_result(index, name, status, error=None):
+    result = {"index": index, "name": name, "status": status}
+    if error:
+        result["error"] = error
+    return result
+
+
+def _split_valid_items(items, required_fields, label):
+    """
+    Validate each item of a bulk request.
+    Returns (results, valid) where results holds an entry per rejected item
+    and valid is a list of (index, item) pairs that passed validation.
+    """
+    results = [None] * len(items)
+    valid = []
+    seen = set()
+
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = _item_result(index, None, "error", "Item must be an object")
+            continue
+
+        name = item.get("name")
+        missing = [field for field in required_fields if not item.get(field)]
+        if missing:
+            results[index] = _item_result(index, name if isinstance(name, str) else None, "error",
+                                          f"Missing {' or '.join(missing)}")
+            continue
+
+        if not isinstance(name, str) or not name.strip():
+            results[index] = _item_result(index, None, "error", "name must be a non-empty string")
+            continue
+
+        if name in seen:
+            results[index] = _item_result(index, name, "error", f"{label} '{name}' is repeated in this request")
+            continue
+
+        seen.add(name)
+        valid.append((index, item))
+
+    return results, valid
+
+
+def update_error(updates, allowed_fields):
+    """
+    Check a client-supplied {"field": value} update against the fields the
+    caller may change ({field: type}). Returns an error message or None.
+    Anything else (department, _id, ...) is rejected, so an update can never
+    move a record to another department.
+    """
+    if not isinstance(updates, dict) or not updates:
+        return "updates must be a non-empty object"
+
+    rejected = sorted(str(field) for field in updates if field not in allowed_fields)
+    if rejected:
+        return f"Cannot update {', '.join(rejected)}; allowed fields are {', '.join(allowed_fields)}"
+
+    for field, value in updates.items():
+        expected = allowed_fields[field]
+        if expected is str and not (isinstance(value, str) and value.strip()):
+            return f"{field} must be a non-empty string"
+        if not isinstance(value, expected):
+            return f"{field} must be a {expected.__name__}"
+
+    return None
+
+
+def _summary(results, ok_status):
+    succeeded = sum(1 for r in results if r["status"] == ok_status)
+    return {
+        ok_status: succeeded,
+        "failed": len(results) - succeeded,
+        "results": results
+    }
+
+
+# ---------- Bulk add ----------
+def bulk_add_named(collection, items, label):
+    """
+    Insert many {"name", "short_name"} records with one lookup and a single
+    unordered insert_many. Names that already exist are reported per item;
+    the unique (department, name) index (see modules/indexes.py) is only a
+    backstop for concurrent inserts.
+    """
+    results, valid = _split_valid_items(items, ["name", "short_name"], label)
+
+    if valid:
+        names = [item["name"] for _, item in valid]
+        existing = {
+            doc["name"] for doc in collection.find(tenancy.scoped({"name": {"$in": names}}), {"_id": 0, "name": 1})
+        }
+
+        new_items = []
+        for index, item in valid:
+            if item["name"] in existing:
+                results[index] = _item_result(index, item["name"], "error", f"{label} '{item['name']}' already exists")
+            else:
+                new_items.append((index, item))
+        valid = new_items
+
+    if valid:
+        docs = [tenancy.stamp({"name": item["name"], "short_name": item["short_name"]}) for _, item in valid]
+        write_errors = {}
+        try:
+            collection.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            write_errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+
+        for position, (index, item) in enumerate(valid):
+            name = item["name"]
+            err = write_errors.get(position)
+            if err is None:
+                results[index] = _item_result(index, name, "added")
+            elif err.get("code") == DUPLICATE_KEY_ERROR:
+                results[index] = _item_result(index, name, "error", f"{label} '{name}' already exists")
+            else:
+                results[index] = _item_result(index, name, "error", err.get("errmsg", "Write failed"))
+
+    return _summary(results, "added")
+
+
+# ---------- Bulk update ----------
+def bulk_update_named(collection, items, label, allowed_fields):
+    """
+    Apply many {"name", "updates"} records with one lookup and one unordered bulk_write.
+    Only the fields in allowed_fields ({field: type}) may be updated.
+    """
+    results, valid = _split_valid_items(items, ["name", "updates"], label)
+
+    checked = []
+    for index, item in valid:
+        error = update_error(item["updates"], allowed_fields)
+        if error:
+            results[index] = _item_result(index, item["name"], "error", error)
+        else:
+            checked.append((index, item))
+    valid = checked
+
+    if valid:
+        names = [item["name"] for _, item in valid]
+        existing = {
+            doc["name"] for doc in collection.find(tenancy.scoped({"name": {"$in": names}}), {"_id": 0, "name": 1})
+        }
+
+        operations = []
+        pending = []
+        for index, item in valid:
+            name = item["name"]
+            if name not in existing:
+                results[index] = _item_result(index, name, "error", f"{label} '{name}' not found")
+                continue
+            operations.append(UpdateOne(tenancy.scoped({"name": name}), {"$set": item["updates"]}))
+            pending.append((index, name))
+
+        write_errors = {}
+        if operations:
+            try:
+                collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                write_errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+
+        for position, (index, name) in enumerate(pending):
+            err = write_errors.get(position)
+            if err is None:
+                results[index] = _item_result(index, name, "updated")
+            elif err.get("code") == DUPLICATE_KEY_ERROR:
+                results[index] = _item_result(index, name, "error", "Update would create a duplicate name")
+            else:
+                results[index] = _item_result(index, name, "error", err.get("errmsg", "Write failed"))
+
+    return _summary(results, "updated")
+
+
+# ---------- Bulk delete ----------
+def bulk_delete_named(collection, items, label):
+    """
+    Delete many records by name with one lookup and one delete_many.
+    Items may be plain names or {"name": ...} objects.
+    """
+    items = [{"name": item} if isinstance(item, str) else item for item in items]
+    results, valid = _split_valid_items(items, ["name"], label)
+
+    if valid:
+        names = [item["name"] for _, item in valid]
+        existing = {
+            doc["name"] for doc in collection.find(tenancy.scoped({"name": {"$in": names}}), {"_id": 0, "name": 1})
+        }
+
+        if existing:
+            collection.delete_many(tenancy.scoped({"name": {"$in": list(existing)}}))
+
+        for index, item in valid:
+            name = item["name"]
+            if name in existing:
+                results[index] = _item_result(index, name, "deleted")
+            else:
+                results[index] = _item_result(index, name, "error", f"{label} '{name}' not found")
+
+    return _summary(results, "deleted")
@@ -1,12 +1,31 @@
 from flask import jsonify
 from config import db
+from modules import tenancy, versioning
 
 # Collection for class structure
 class_structure_collection = db['class_structure']
 
-def save_class_structure(data):
+# Fields managed by the server, never taken from the request body
+RESERVED_FIELDS = ['_id', 'department', 'version', 'updated_at']
+
+
+def get_class_structure():
+    """Return the department's class structure with its version (also sent as the ETag)"""
+    try:
+        doc = class_structure_collection.find_one(tenancy.scoped(), {'_id': 0, 'department': 0, 'updated_at': 0})
+        if not doc:
+            return jsonify({"error": "No class structure saved"}), 404
+
+        return versioning.with_etag(jsonify(doc), versioning.version_of(doc))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def save_class_structure(data, if_match=None):
     """
-    Saves the class structure by overwriting the previous one.
+    Saves the department's class structure, replacing its document in place.
+    Send the version from GET as If-Match to reject the save (412) when
+    someone else saved in between.
     Expected data format:
     {
         "sy": [{"div": "A", "batches": 2}, ...],
@@ -19,13 +38,21 @@ def save_class_structure(data):
         return jsonify({"error": "No data provided"}), 400
 
     try:
-        # Delete existing structure
-        class_structure_collection.delete_many({})
+        expected = versioning.parse_if_match(if_match)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Insert new structure
-        class_structure_collection.insert_one(data)
+    try:
+        structure = {key: value for key, value in data.items() if key not in RESERVED_FIELDS}
+        version = versioning.save(class_structure_collection, tenancy.scoped(), structure, expected)
 
-        return jsonify({"message": "Class structure saved successfully!"})
+        return versioning.with_etag(
+            jsonify({"message": "Class structure saved successfully!", "version": version}), version
+        )
 
+    except versioning.VersionConflict as e:
+        return versioning.with_etag(
+            jsonify({"error": str(e), "current_version": e.current_version}), e.current_version
+        ), 412
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,165 @@
+"""
+Exact CP-SAT formulation of the practical timetable.
+
+Each batch assignment is a block of contiguous slots. It gets exactly one
+start (day, first slot) and, for that start, exactly one lab and exactly one
+eligible faculty. Lab and faculty choices only interact through the start,
+so they are modelled as two separate channels tied to the start variable
+instead of one variable per (start, lab, faculty) combination. A start
+occupies every slot its block covers.
+
+Requires the open-source OR-Tools package (pip install ortools).
+"""
+import time
+from modules import logging_setup
+
+try:
+    from ortools.sat.python import cp_model
+except ImportError:  # OR-Tools is optional, only the 'cpsat' backend needs it
+    cp_model = None
+
+DEFAULT_TIME_LIMIT_SECONDS = 60
+DEFAULT_NUM_WORKERS = 8
+
+tracer = logging_setup.get_tracer(__name__)
+
+
+def is_available():
+    return cp_model is not None
+
+
+def solve(batch_assignments, labs, eligible, days, slots,
+          time_limit=DEFAULT_TIME_LIMIT_SECONDS, num_workers=DEFAULT_NUM_WORKERS,
+          lab_blocked=None, faculty_blocked=None, trace=False):
+    """
+    Solve the assignment exactly.
+    eligible maps (subject_full, division) -> list of qualified faculty names.
+    lab_blocked / faculty_blocked map a name to the set of unavailable (day, slot);
+    no variable is created for a lab or faculty that is blocked during the block.
+    Returns (placements, stats); placements is a list of
+    (assignment, day, first slot, lab, faculty_name) or None when no timetable was
+    found, and stats['status'] tells whether infeasibility was proven.
+    """
+    if cp_model is None:
+        raise RuntimeError("The 'cpsat' backend requires the 'ortools' package")
+
+    started = time.perf_counter()
+    model = cp_model.CpModel()
+    periods = [(day, slot) for day in days for slot in slots]
+    lab_blocked = lab_blocked or {}
+    faculty_blocked = faculty_blocked or {}
+    lab_names = [lab.get('name', 'Unknown Lab') for lab in labs]
+
+    def is_free(blocked, covered):
+        return not blocked or not any(periods[q] in blocked for q in covered)
+
+    period_vars = {}
+    lab_vars = {}
+    faculty_vars = {}
+    lab_load = {}
+    faculty_load = {}
+    batch_load = {}
+    starts = {}
+
+    for a, assignment in enumerate(batch_assignments):
+        faculty_names = eligible.get((assignment['subject_full'], assignment['division']), [])
+        batch_key = (assignment['class'], assignment['division'], assignment['batch'])
+        length = assignment.get('periods', 1)
+
+        # Periods p where the block fits before the end of the day
+        starts[a] = [
+            d * len(slots) + s
+            for d in range(len(days))
+            for s in range(len(slots) - length + 1)
+        ]
+
+        for p in starts[a]:
+            covered = range(p, p + length)
+            placed = model.NewBoolVar(f"t_{a}_{p}")
+            period_vars[a, p] = placed
+            for q in covered:
+                batch_load.setdefault((batch_key, q), []).append(placed)
+
+            in_lab = []
+            for l in range(len(labs)):
+                if not is_free(lab_blocked.get(lab_names[l]), covered):
+                    continue
+                var = model.NewBoolVar(f"y_{a}_{p}_{l}")
+                lab_vars[a, p, l] = var
+                for q in covered:
+                    lab_load.setdefault((q, l), []).append(var)
+                in_lab.append(var)
+            if in_lab:
+                model.Add(sum(in_lab) == placed)
+            else:
+                model.Add(placed == 0)
+
+            taught_by = []
+            for name in faculty_names:
+                if not is_free(faculty_blocked.get(name), covered):
+                    continue
+                var = model.NewBoolVar(f"z_{a}_{p}_{name}")
+                faculty_vars[a, p, name] = var
+                for q in covered:
+                    faculty_load.setdefault((q, name), []).append(var)
+                taught_by.append(var)
+            if taught_by:
+                model.Add(sum(taught_by) == placed)
+            else:
+                model.Add(placed == 0)
+
+        # Every batch assignment is scheduled exactly once
+        model.AddExactlyOne(period_vars[a, p] for p in starts[a])
+
+    # C1: a batch attends one practical per period
+    for placed in batch_load.values():
+        if len(placed) > 1:
+            model.AddAtMostOne(placed)
+
+    # C2: a lab hosts one batch per period
+    for hosted in lab_load.values():
+        if len(hosted) > 1:
+            model.AddAtMostOne(hosted)
+
+    # C3: a faculty teaches one batch per period
+    for taught in faculty_load.values():
+        if len(taught) > 1:
+            model.AddAtMostOne(taught)
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = float(time_limit)
+    solver.parameters.num_workers = int(num_workers)
+    if trace:
+        # Send the solver's search log to the debug trace instead of stdout
+        solver.parameters.log_search_progress = True
+        solver.parameters.log_to_stdout = False
+        solver.log_callback = lambda line: line and tracer.debug("cp-sat %s", line)
+    status = solver.Solve(model)
+
+    stats = {
+        "backend": "cpsat",
+        "status": solver.StatusName(status),
+        "wall_time_seconds": round(solver.WallTime(), 4),
+        "build_time_seconds": round(time.perf_counter() - started - solver.WallTime(), 4),
+        "branches": solver.NumBranches(),
+        "conflicts": solver.NumConflicts(),
+        "variables": len(period_vars) + len(lab_vars) + len(faculty_vars),
+        "time_limit_seconds": float(time_limit),
+        "num_workers": int(num_workers)
+    }
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, stats
+
+    placements = []
+    for a, assignment in enumerate(batch_assignments):
+        p = next(p for p in starts[a] if solver.Value(period_vars[a, p]))
+        lab = next(labs[l] for l in range(len(labs)) if (a, p, l) in lab_vars and solver.Value(lab_vars[a, p, l]))
+        faculty_name = next(
+            name for name in eligible.get((assignment['subject_full'], assignment['division']), [])
+            if (a, p, name) in faculty_vars and solver.Value(faculty_vars[a, p, name])
+        )
+        day, slot = periods[p]
+        placements.append((assignment, day, slot, lab, faculty_name))
+
+    return placements, stats
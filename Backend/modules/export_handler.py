@@ -0,0 +1,245 @@
+import csv
+import re
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from flask import jsonify, Response
+from config import db
+from modules import tenancy
+from modules.timetable_generator import HOURS_PER_SLOT
+
+master_lab_timetable_collection = db['master_lab_timetable']
+
+VIEWS = ['lab', 'faculty', 'division']
+CSV_COLUMNS = ['year', 'semester', 'lab', 'day', 'slot', 'division', 'batch', 'subject', 'subject_full', 'faculty']
+WEEKDAYS = {name: index for index, name in enumerate(
+    ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+)}
+SLOT_DURATION_MINUTES = HOURS_PER_SLOT * 60   # Every practical slot is one lab session
+DEFAULT_SEMESTER_WEEKS = 15
+FILE_CHUNK_SIZE = 64 * 1024
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'ics': 'text/calendar'
+}
+
+
+# ---------- Schedule traversal ----------
+def _iter_entries(timetable, view, name):
+    """
+    Yield one flat row per scheduled batch straight from the stored schedule.
+    The lab view walks lab -> day -> slot, the faculty and division views walk
+    day -> slot -> lab so their rows come out in chronological order.
+    """
+    labs = timetable.get('schedule', {}).get('labs', {})
+    base = {'year': timetable.get('year'), 'semester': timetable.get('semester')}
+
+    def rows_for(lab_name, day, slot):
+        for entry in labs[lab_name][day][slot]:
+            if view == 'faculty' and name and entry.get('faculty') != name:
+                continue
+            if view == 'division' and name and entry.get('division') != name:
+                continue
+            row = dict(base, lab=lab_name, day=day, slot=slot)
+            for column in CSV_COLUMNS[5:]:
+                row[column] = entry.get(column)
+            yield row
+
+    if view == 'lab':
+        for lab_name, lab_schedule in labs.items():
+            if name and lab_name != name:
+                continue
+            for day, day_schedule in lab_schedule.items():
+                for slot in day_schedule:
+                    yield from rows_for(lab_name, day, slot)
+    else:
+        days = []
+        for lab_schedule in labs.values():
+            for day, day_schedule in lab_schedule.items():
+                if day not in days:
+                    days.append(day)
+        for day in days:
+            slots = []
+            for lab_schedule in labs.values():
+                for slot in lab_schedule.get(day, {}):
+                    if slot not in slots:
+                        slots.append(slot)
+            for slot in slots:
+                for lab_name, lab_schedule in labs.items():
+                    if slot in lab_schedule.get(day, {}):
+                        yield from rows_for(lab_name, day, slot)
+
+
+# ---------- CSV ----------
+class _LineBuffer:
+    """File-like object that hands back whatever csv.writer writes"""
+
+    def write(self, value):
+        return value
+
+
+def _stream_csv(rows):
+    writer = csv.writer(_LineBuffer())
+    yield writer.writerow(CSV_COLUMNS)
+    for row in rows:
+        yield writer.writerow([row[column] for column in CSV_COLUMNS])
+
+
+# ---------- XLSX ----------
+def _stream_xlsx(rows):
+    """
+    Write rows through openpyxl's write-only workbook into a temporary file
+    and stream that file back in fixed-size chunks.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Timetable')
+    sheet.append(CSV_COLUMNS)
+    for row in rows:
+        sheet.append([row[column] for column in CSV_COLUMNS])
+
+    with tempfile.TemporaryFile() as buffer:
+        workbook.save(buffer)
+        buffer.seek(0)
+        while True:
+            chunk = buffer.read(FILE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+# ---------- iCalendar ----------
+def _ics_escape(value):
+    return (str(value if value is not None else '')
+            .replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _ics_line(line):
+    """Fold a content line at 75 octets as required by RFC 5545"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+
+    parts = []
+    limit = 75
+    while encoded:
+        cut = min(limit, len(encoded))
+        # Never split a multi-byte character
+        while cut < len(encoded) and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+        limit = 74
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _stream_ics(rows, semester_start, weeks):
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    week_start = semester_start - timedelta(days=semester_start.weekday())
+
+    yield _ics_line('BEGIN:VCALENDAR')
+    yield _ics_line('VERSION:2.0')
+    yield _ics_line('PRODID:-//Schedulo//Timetable Export//EN')
+    yield _ics_line('CALSCALE:GREGORIAN')
+
+    for row in rows:
+        weekday = WEEKDAYS.get(row['day'])
+        try:
+            hour, minute = (int(part) for part in str(row['slot']).split(':'))
+        except ValueError:
+            continue
+        if weekday is None:
+            continue
+
+        first_day = week_start + timedelta(days=weekday)
+        if first_day < semester_start:
+            first_day += timedelta(days=7)
+        start = datetime(first_day.year, first_day.month, first_day.day, hour, minute)
+        end = start + timedelta(minutes=SLOT_DURATION_MINUTES)
+
+        uid = '-'.join(str(row[c]) for c in ('year', 'semester', 'lab', 'day', 'slot', 'division', 'batch'))
+        uid = re.sub(r'\s+', '_', uid)
+        summary = f"{row['subject']} - {row['year']} {row['division']} Batch {row['batch']}"
+
+        yield _ics_line('BEGIN:VEVENT')
+        yield _ics_line(f'UID:{_ics_escape(uid)}@schedulo')
+        yield _ics_line(f'DTSTAMP:{stamp}')
+        yield _ics_line(f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}")
+        yield _ics_line(f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}")
+        yield _ics_line(f'RRULE:FREQ=WEEKLY;COUNT={weeks}')
+        yield _ics_line(f'SUMMARY:{_ics_escape(summary)}')
+        yield _ics_line(f"LOCATION:{_ics_escape(row['lab'])}")
+        yield _ics_line(f"DESCRIPTION:{_ics_escape(row['subject_full'])}\\nFaculty: {_ics_escape(row['faculty'])}")
+        yield _ics_line('END:VEVENT')
+
+    yield _ics_line('END:VCALENDAR')
+
+
+# ---------- Export entry point ----------
+def export_timetable(file_format, args):
+    """
+    Stream a stored master timetable as CSV, XLSX or iCalendar
+    Expected query parameters:
+        year=SY&sem=1                  required
+        view=lab|faculty|division      default lab
+        name=<lab, faculty or div>     optional filter for the chosen view
+        start=YYYY-MM-DD&weeks=15      calendar range, ics only
+    """
+    year = args.get('year')
+    sem = args.get('sem')
+    view = args.get('view', 'lab').lower()
+    name = args.get('name')
+
+    if file_format not in MIMETYPES:
+        return jsonify({"error": f"Unsupported export format '{file_format}'"}), 404
+
+    if not year or not sem:
+        return jsonify({"error": "Missing year or semester"}), 400
+
+    if view not in VIEWS:
+        return jsonify({"error": f"Invalid view, expected one of {', '.join(VIEWS)}"}), 400
+
+    try:
+        semester_start = date.fromisoformat(args['start']) if args.get('start') else date.today()
+        weeks = int(args.get('weeks', DEFAULT_SEMESTER_WEEKS))
+        if weeks < 1:
+            raise ValueError
+    except ValueError:
+        return jsonify({"error": "Invalid start date or weeks"}), 400
+
+    if file_format == 'xlsx':
+        try:
+            import openpyxl  # noqa: F401
+        except ImportError:
+            return jsonify({"error": "XLSX export requires the 'openpyxl' package"}), 400
+
+    try:
+        timetable = master_lab_timetable_collection.find_one(
+            tenancy.scoped({"year": year, "semester": sem}),
+            {'_id': 0, 'year': 1, 'semester': 1, 'schedule.labs': 1}
+        )
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+    if not timetable:
+        return jsonify({"error": f"Timetable not found for {year} sem {sem}"}), 404
+
+    rows = _iter_entries(timetable, view, name)
+
+    if file_format == 'csv':
+        body = _stream_csv(rows)
+    elif file_format == 'xlsx':
+        body = _stream_xlsx(rows)
+    else:
+        body = _stream_ics(rows, semester_start, weeks)
+
+    parts = ['timetable', year, f'sem{sem}', view] + ([name] if name else [])
+    filename = re.sub(r'[^A-Za-z0-9_.-]+', '_', '_'.join(parts)) + f'.{file_format}'
+
+    return Response(
+        body,
+        mimetype=MIMETYPES[file_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
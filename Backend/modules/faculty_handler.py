@@ -1,13 +1,21 @@
 from flask import jsonify
+from pymongo.errors import DuplicateKeyError
 from config import db
+from modules import bulk_operations, tenancy
 
 # Collection for faculty
 faculty_collection = db['faculty']
 
+# Fields a client may change through update; department and _id are never writable
+FACULTY_FIELDS = {
+    'name': str,
+    'short_name': str
+}
+
 # ---------- Display all faculties ----------
 def display_faculty():
     try:
-        faculties = list(faculty_collection.find({}, {'_id': 0}))
+        faculties = list(faculty_collection.find(tenancy.scoped(), {'_id': 0, 'department': 0}))
         return jsonify(faculties)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -22,15 +30,15 @@ def add_faculty(data):
         return jsonify({"error": "Missing name or short_name"}), 400
 
     # Check if faculty already exists
-    existing = faculty_collection.find_one({"name": name})
+    existing = faculty_collection.find_one(tenancy.scoped({"name": name}))
     if existing:
         return jsonify({"error": f"Faculty '{name}' already exists"}), 400
 
     try:
-        faculty_collection.insert_one({
+        faculty_collection.insert_one(tenancy.stamp({
             "name": name,
             "short_name": short_name
-        })
+        }))
         return jsonify({"message": f"Faculty '{name}' added successfully!"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -44,7 +52,7 @@ def delete_faculty(data):
         return jsonify({"error": "Missing name"}), 400
 
     try:
-        result = faculty_collection.delete_one({"name": name})
+        result = faculty_collection.delete_one(tenancy.scoped({"name": name}))
         if result.deleted_count == 0:
             return jsonify({"error": f"Faculty '{name}' not found"}), 404
         return jsonify({"message": f"Faculty '{name}' deleted successfully!"})
@@ -60,10 +68,47 @@ def update_faculty(data):
     if not name or not updates:
         return jsonify({"error": "Missing name or updates"}), 400
 
+    error = bulk_operations.update_error(updates, FACULTY_FIELDS)
+    if error:
+        return jsonify({"error": error}), 400
+
     try:
-        result = faculty_collection.update_one({"name": name}, {"$set": updates})
+        result = faculty_collection.update_one(tenancy.scoped({"name": name}), {"$set": updates})
         if result.matched_count == 0:
             return jsonify({"error": f"Faculty '{name}' not found"}), 404
         return jsonify({"message": f"Faculty '{name}' updated successfully!"})
+    except DuplicateKeyError:
+        return jsonify({"error": f"Faculty '{updates['name']}' already exists"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ---------- Bulk add / update / delete ----------
+def bulk_faculty(data):
+    """
+    Apply one action to many faculty records in a single request.
+    Expected data:
+    {
+        "action": "add",
+        "faculties": [{"name": "...", "short_name": "..."}, ...]
+    }
+    For "update" each item is {"name": "...", "updates": {...}},
+    for "delete" each item is a name or {"name": "..."}.
+    """
+    action = data.get('action', '').lower()
+    items = data.get('faculties')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing faculties list"}), 400
+
+    try:
+        if action == 'add':
+            return jsonify(bulk_operations.bulk_add_named(faculty_collection, items, "Faculty"))
+        elif action == 'update':
+            return jsonify(bulk_operations.bulk_update_named(faculty_collection, items, "Faculty", FACULTY_FIELDS))
+        elif action == 'delete':
+            return jsonify(bulk_operations.bulk_delete_named(faculty_collection, items, "Faculty"))
+        else:
+            return jsonify({"error": "Invalid action"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
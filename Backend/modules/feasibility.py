@@ -0,0 +1,185 @@
+"""
+Fast pre-solve analysis for the practical timetable.
+
+Every check here is a necessary condition for a timetable to exist, so a
+failed check proves the instance infeasible without running the search.
+Passing all checks does not guarantee the search will succeed.
+"""
+from collections import deque
+
+
+def _check(name, resource, demand, capacity, detail, offenders=None):
+    result = {
+        "check": name,
+        "resource": resource,
+        "demand": demand,
+        "capacity": capacity,
+        "ok": demand <= capacity,
+        "detail": detail
+    }
+    if offenders:
+        result["ok"] = False
+        result["offenders"] = offenders
+    return result
+
+
+def _periods(assignment):
+    """Slots occupied by one batch assignment (a contiguous block)"""
+    return assignment.get('periods', 1)
+
+
+def _batch_key(assignment):
+    return f"{assignment['class']} {assignment['division']} batch {assignment['batch']}"
+
+
+def _subject_key(assignment):
+    """Faculty are qualified per subject and division"""
+    return f"{assignment['subject_full']} ({assignment['class']} {assignment['division']})"
+
+
+def _max_flow(capacity, source, sink):
+    """Edmonds-Karp on a dict-of-dicts residual graph; returns (flow, reachable)"""
+    flow = 0
+    while True:
+        parent = {source: None}
+        queue = deque([source])
+        while queue and sink not in parent:
+            node = queue.popleft()
+            for neighbour, residual in capacity[node].items():
+                if residual > 0 and neighbour not in parent:
+                    parent[neighbour] = node
+                    queue.append(neighbour)
+
+        if sink not in parent:
+            # Nodes still reachable from the source form the min-cut side
+            return flow, set(parent)
+
+        # Find bottleneck along the path, then push flow
+        path_flow = float('inf')
+        node = sink
+        while parent[node] is not None:
+            path_flow = min(path_flow, capacity[parent[node]][node])
+            node = parent[node]
+
+        node = sink
+        while parent[node] is not None:
+            prev = parent[node]
+            capacity[prev][node] -= path_flow
+            capacity[node].setdefault(prev, 0)
+            capacity[node][prev] += path_flow
+            node = prev
+
+        flow += path_flow
+
+
+def analyse(batch_assignments, labs, faculties, is_qualified, days, slots,
+            lab_blocked=None, faculty_blocked=None):
+    """
+    Compare demand for practical sessions with the available capacity.
+    is_qualified(faculty_name, assignment) must match the rule the search uses;
+    it is asked once per subject and division.
+    lab_blocked / faculty_blocked map a name to the set of unavailable (day, slot).
+    Returns a report dict; report['feasible'] is False when any check fails and
+    report['bottlenecks'] lists the failing checks.
+    """
+    lab_blocked = lab_blocked or {}
+    faculty_blocked = faculty_blocked or {}
+    grid = [(day, slot) for day in days for slot in slots]
+    grid_periods = set(grid)
+    periods = len(grid)
+    total_demand = sum(_periods(a) for a in batch_assignments)
+    faculty_names = [f.get('name', '') for f in faculties]
+    lab_names = [lab.get('name', 'Unknown Lab') for lab in labs]
+    checks = []
+
+    def free_periods(blocked, name):
+        # Only blackouts on the grid take capacity away
+        return periods - len(grid_periods.intersection(blocked.get(name, ())))
+
+    # C1: every session needs a lab period
+    lab_periods = sum(free_periods(lab_blocked, name) for name in lab_names)
+    checks.append(_check(
+        "lab_capacity", "labs", total_demand, lab_periods,
+        f"{total_demand} session periods for {lab_periods} available lab periods "
+        f"({len(labs)} labs x {periods} periods minus blackouts)"
+    ))
+
+    # C2: a batch attends at most one session per period
+    batch_demand = {}
+    for assignment in batch_assignments:
+        key = _batch_key(assignment)
+        batch_demand[key] = batch_demand.get(key, 0) + _periods(assignment)
+    overloaded = sorted(key for key, demand in batch_demand.items() if demand > periods)
+    checks.append(_check(
+        "batch_periods", "batches", max(batch_demand.values(), default=0), periods,
+        f"Busiest batch needs {max(batch_demand.values(), default=0)} of {periods} periods",
+        overloaded
+    ))
+
+    # C3: every subject needs at least one qualified faculty in each division
+    subject_demand = {}
+    subject_assignment = {}
+    for assignment in batch_assignments:
+        subject = _subject_key(assignment)
+        subject_demand[subject] = subject_demand.get(subject, 0) + _periods(assignment)
+        subject_assignment.setdefault(subject, assignment)
+    qualified = {
+        subject: [name for name in faculty_names if is_qualified(name, subject_assignment[subject])]
+        for subject in subject_demand
+    }
+    unstaffed = sorted(subject for subject, names in qualified.items() if not names)
+    checks.append(_check(
+        "subject_staffing", "faculty", len(unstaffed), 0,
+        "Subjects without any qualified faculty" if unstaffed else "Every subject has a qualified faculty",
+        unstaffed
+    ))
+
+    # C4: faculty periods, as a bipartite flow subjects -> qualified faculty
+    # (each faculty can take at most one session per period)
+    graph = {'source': {}, 'sink': {}}
+    for subject, demand in subject_demand.items():
+        node = ('subject', subject)
+        graph['source'][node] = demand
+        graph[node] = {('faculty', name): demand for name in qualified[subject]}
+    for name in set(n for names in qualified.values() for n in names):
+        graph.setdefault(('faculty', name), {})['sink'] = free_periods(faculty_blocked, name)
+    for node in list(graph):
+        for neighbour in graph[node]:
+            graph.setdefault(neighbour, {})
+
+    assignable, reachable = _max_flow(graph, 'source', 'sink')
+    saturated = sorted(
+        node[1] for node in reachable
+        if isinstance(node, tuple) and node[0] == 'faculty'
+    ) if assignable < total_demand else []
+    checks.append(_check(
+        "faculty_capacity", "faculty", total_demand, assignable,
+        f"Qualified faculty can cover at most {assignable} of {total_demand} session periods"
+        + (f"; fully booked: {', '.join(saturated)}" if saturated else ""),
+        saturated
+    ))
+
+    # C5: per period, sessions are bounded by both free labs and free faculty
+    teaching = set(n for names in qualified.values() for n in names)
+    concurrent = sum(
+        min(
+            sum(1 for name in lab_names if period not in lab_blocked.get(name, ())),
+            sum(1 for name in teaching if period not in faculty_blocked.get(name, ()))
+        )
+        for period in grid
+    )
+    checks.append(_check(
+        "concurrent_sessions", "labs/faculty", total_demand, concurrent,
+        f"Free labs and teaching faculty allow at most {concurrent} session periods "
+        f"({len(labs)} labs, {len(teaching)} teaching faculty, {periods} periods)"
+    ))
+
+    bottlenecks = [check for check in checks if not check['ok']]
+    return {
+        "feasible": not bottlenecks,
+        "periods": periods,
+        "sessions": len(batch_assignments),
+        "session_periods": total_demand,
+        "checks": checks,
+        "bottlenecks": bottlenecks
+    }
@@ -0,0 +1,26 @@
+import time
+from flask import jsonify
+import config
+
+
+def check_health():
+    """
+    Report database reachability, ping latency and connection pool usage.
+    Returns 503 when MongoDB cannot be reached within the server selection timeout.
+    """
+    health = {"status": "ok"}
+
+    try:
+        started = time.perf_counter()
+        config.get_client().admin.command('ping')
+        health["db"] = {
+            "status": "ok",
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2)
+        }
+    except Exception as e:
+        health["status"] = "unavailable"
+        health["db"] = {"status": "error", "error": str(e)}
+
+    health["pool"] = config.get_pool_stats()
+
+    return jsonify(health), 200 if health["status"] == "ok" else 503
@@ -0,0 +1,350 @@
+import codecs
+import csv
+import io
+import os
+import zipfile
+from bson import ObjectId
+from flask import jsonify
+from config import db
+from modules import tenancy, versioning
+from modules.timetable_generator import practical_hours_error
+
+subjects_collection = db['subjects']
+class_structure_collection = db['class_structure']
+workload_collection = db['workload']
+faculty_collection = db['faculty']
+staging_collection = db['import_staging']
+
+IMPORT_BATCH_SIZE = 500      # Rows written to MongoDB per round-trip
+MAX_REPORTED_ERRORS = 100    # Row errors returned in the response
+ENCODING_CHECK_CHUNK = 64 * 1024  # Bytes decoded per step when checking a CSV upload
+YEAR_KEYS = ['sy', 'ty', 'be']
+
+
+class InvalidUpload(Exception):
+    """The uploaded file cannot be read in the declared format"""
+
+
+class RowErrors:
+    """Collects per-row errors, keeping only the first few in memory"""
+
+    def __init__(self, limit=MAX_REPORTED_ERRORS):
+        self.limit = limit
+        self.count = 0
+        self.reported = []
+
+    def add(self, row_number, message):
+        self.count += 1
+        if len(self.reported) < self.limit:
+            self.reported.append({"row": row_number, "error": message})
+
+
+# ---------- Row readers ----------
+def _normalise_header(value):
+    return str(value or '').strip().lower().replace(' ', '_')
+
+
+def _check_utf8(stream):
+    """
+    Decode the whole upload once, chunk by chunk, so an encoding error is
+    raised before any row is written; raises UnicodeDecodeError
+    """
+    if not stream.seekable():
+        return
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    for chunk in iter(lambda: stream.read(ENCODING_CHECK_CHUNK), b''):
+        decoder.decode(chunk)
+    decoder.decode(b'', final=True)
+    stream.seek(0)
+
+
+def _read_csv_rows(stream):
+    """Yield (row_number, row_dict) from a CSV upload without loading it whole"""
+    _check_utf8(stream)
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [_normalise_header(h) for h in next(reader, [])]
+
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        yield reader.line_num, dict(zip(header, values))
+
+
+def _read_xlsx_rows(stream):
+    """Yield (row_number, row_dict) from the first sheet of an XLSX upload"""
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise RuntimeError("XLSX import requires the 'openpyxl' package")
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError):
+        # KeyError: a zip archive without the parts of a workbook
+        raise InvalidUpload("file must be a valid XLSX workbook")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_normalise_header(h) for h in next(rows, ())]
+
+        for row_number, values in enumerate(rows, start=2):
+            if all(v is None or str(v).strip() == '' for v in values):
+                continue
+            yield row_number, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+ROW_READERS = {
+    'csv': _read_csv_rows,
+    'xlsx': _read_xlsx_rows
+}
+
+
+# ---------- Field helpers ----------
+def _text(row, field):
+    value = row.get(field)
+    value = '' if value is None else str(value).strip()
+    if not value:
+        raise ValueError(f"Missing '{field}'")
+    return value
+
+
+def _hours(row, field, minimum=0):
+    value = row.get(field)
+    if value is None or str(value).strip() == '':
+        return minimum
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"'{field}' must be a number")
+    if number < minimum or number != int(number):
+        raise ValueError(f"'{field}' must be a whole number >= {minimum}")
+    return int(number)
+
+
+def _practical_hours(row, field):
+    hours = _hours(row, field)
+    error = practical_hours_error(hours, field)
+    if error:
+        raise ValueError(error)
+    return hours
+
+
+def _year_key(row):
+    year = _text(row, 'year').lower()
+    if year not in YEAR_KEYS:
+        raise ValueError(f"Unknown year '{year}', expected one of {', '.join(YEAR_KEYS)}")
+    return year
+
+
+# ---------- Row validators ----------
+def _validate_subject_row(row):
+    return _year_key(row), {
+        "name": _text(row, 'name'),
+        "short_name": _text(row, 'short_name'),
+        "hrs_per_week_practical": _practical_hours(row, 'hrs_per_week_practical'),
+        "hrs_per_week_lec": _hours(row, 'hrs_per_week_lec')
+    }
+
+
+def _validate_class_row(row):
+    return _year_key(row), {
+        "div": _text(row, 'div'),
+        "batches": _hours(row, 'batches', minimum=1)
+    }
+
+
+def _workload_validator(faculty_ids):
+    def validate(row):
+        faculty_name = _text(row, 'faculty_name')
+        faculty_id = faculty_ids.get(faculty_name)
+        if faculty_id is None:
+            raise ValueError(f"Faculty '{faculty_name}' not found")
+        return faculty_id, {
+            "year": _year_key(row).upper(),
+            "class": _text(row, 'class'),
+            "practical_hrs": _practical_hours(row, 'practical_hrs'),
+            "lec_hrs": _hours(row, 'lec_hrs')
+        }
+    return validate
+
+
+# ---------- Pipeline stages ----------
+def _validated(rows, validate, errors):
+    """Yield validated records, recording rows that fail validation"""
+    for row_number, row in rows:
+        try:
+            yield validate(row)
+        except ValueError as e:
+            errors.add(row_number, str(e))
+
+
+def _batched(records, size=IMPORT_BATCH_SIZE):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _group_by_key(batch):
+    grouped = {}
+    for key, value in batch:
+        grouped.setdefault(key, []).append(value)
+    return grouped
+
+
+# ---------- Writers ----------
+def _write_year_document(collection, batches, field_prefix):
+    """
+    Build a new year-keyed document (subjects or class structure) batch by batch
+    in the staging collection. The department's current document stays in
+    place until the import completes. If at least one row was written, the
+    staged content then replaces it in a single versioned save.
+    """
+    staging_id = staging_collection.insert_one(
+        tenancy.stamp({"target": collection.name, "doc": {field_prefix: {}} if field_prefix else {}})
+    ).inserted_id
+    imported = 0
+
+    try:
+        for batch in batches:
+            grouped = _group_by_key(batch)
+            path = f"doc.{field_prefix}." if field_prefix else "doc."
+            staging_collection.update_one(
+                {"_id": staging_id},
+                {"$push": {f"{path}{key}": {"$each": values} for key, values in grouped.items()}}
+            )
+            imported += len(batch)
+
+        if imported:
+            staged = staging_collection.find_one({"_id": staging_id}, {"doc": 1})
+            versioning.save(collection, tenancy.scoped(), staged["doc"])
+    finally:
+        staging_collection.delete_one({"_id": staging_id})
+
+    return imported
+
+
+def _write_workload(batches):
+    """
+    Replace the workload of every faculty present in the file.
+    Rows are staged per faculty in the staging collection; nothing is
+    written to workload until the whole file has been read. Each faculty's
+    workload is then replaced by a versioned save that expects the version
+    read when the faculty first appeared in the file. Every version is
+    checked before the first save, so a workload saved during the import
+    raises VersionConflict and leaves all workloads as they were.
+    """
+    staging_id = staging_collection.insert_one(tenancy.stamp({"target": "workload", "doc": {}})).inserted_id
+    expected = {}
+    imported = 0
+
+    def current_versions(faculty_ids):
+        return {
+            str(w["faculty_id"]): versioning.version_of(w)
+            for w in workload_collection.find(
+                tenancy.scoped({"faculty_id": {"$in": faculty_ids}}), {"faculty_id": 1, "version": 1}
+            )
+        }
+
+    try:
+        for batch in batches:
+            grouped = {str(faculty_id): subjects for faculty_id, subjects in _group_by_key(batch).items()}
+            new_ids = [faculty_id for faculty_id in grouped if faculty_id not in expected]
+            if new_ids:
+                versions = current_versions([ObjectId(faculty_id) for faculty_id in new_ids])
+                expected.update({faculty_id: versions.get(faculty_id, 0) for faculty_id in new_ids})
+
+            staging_collection.update_one(
+                {"_id": staging_id},
+                {"$push": {f"doc.{faculty_id}": {"$each": subjects} for faculty_id, subjects in grouped.items()}}
+            )
+            imported += len(batch)
+
+        if imported:
+            versions = current_versions([ObjectId(faculty_id) for faculty_id in expected])
+            for faculty_id, version in expected.items():
+                if versions.get(faculty_id, 0) != version:
+                    raise versioning.VersionConflict(versions.get(faculty_id, 0))
+
+            staged = staging_collection.find_one({"_id": staging_id}, {"doc": 1})
+            for faculty_id, subjects in staged["doc"].items():
+                versioning.save(
+                    workload_collection,
+                    tenancy.scoped({"faculty_id": ObjectId(faculty_id)}),
+                    {"subjects": subjects},
+                    expected[faculty_id]
+                )
+    finally:
+        staging_collection.delete_one({"_id": staging_id})
+
+    return imported
+
+
+# ---------- Import entry point ----------
+def import_file(target, file_storage, file_format=None):
+    """
+    Stream an uploaded CSV/XLSX file into subjects, class_structure or workload.
+    Expected columns:
+        subjects:        year, name, short_name, hrs_per_week_practical, hrs_per_week_lec
+        class_structure: year, div, batches
+        workload:        faculty_name, year, class, practical_hrs, lec_hrs
+    """
+    if target not in ('subjects', 'class_structure', 'workload'):
+        return jsonify({"error": f"Unknown import target '{target}'"}), 404
+
+    if file_storage is None or not file_storage.filename:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    file_format = (file_format or os.path.splitext(file_storage.filename)[1].lstrip('.')).lower()
+    reader = ROW_READERS.get(file_format)
+    if reader is None:
+        return jsonify({"error": f"Unsupported file format '{file_format}'"}), 400
+
+    try:
+        errors = RowErrors()
+        rows = reader(file_storage.stream)
+
+        if target == 'subjects':
+            batches = _batched(_validated(rows, _validate_subject_row, errors))
+            imported = _write_year_document(subjects_collection, batches, 'year')
+        elif target == 'class_structure':
+            batches = _batched(_validated(rows, _validate_class_row, errors))
+            imported = _write_year_document(class_structure_collection, batches, None)
+        else:
+            faculty_ids = {
+                f['name']: f['_id'] for f in faculty_collection.find(tenancy.scoped(), {'_id': 1, 'name': 1})
+            }
+            batches = _batched(_validated(rows, _workload_validator(faculty_ids), errors))
+            imported = _write_workload(batches)
+
+        report = {
+            "target": target,
+            "rows_imported": imported,
+            "rows_failed": errors.count,
+            "errors": errors.reported,
+            "errors_truncated": errors.count > len(errors.reported)
+        }
+
+        if not imported:
+            report["error"] = "No valid rows to import"
+            return jsonify(report), 400
+
+        return jsonify(report)
+
+    except UnicodeDecodeError:
+        return jsonify({"error": "file must be UTF-8 encoded CSV"}), 400
+    except InvalidUpload as e:
+        return jsonify({"error": str(e)}), 400
+    except versioning.VersionConflict:
+        return jsonify({"error": f"{target} was changed while the file was imported; nothing was saved, retry the import"}), 409
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
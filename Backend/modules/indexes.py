@@ -0,0 +1,176 @@
+"""
+Index declarations and query plan diagnostics.
+
+ensure_indexes() runs once per deployment, from the gunicorn master
+(gunicorn.conf.py on_starting) or the 'ensure' command; importing the app
+never touches the database. Every index leads with the department key, so
+each department's queries stay within its own index range; the exception is
+the TTL index that expires finished generation jobs. The diagnostics
+command runs explain() on the queries the handlers issue and flags
+collection scans:
+
+    python -m modules.indexes explain
+    python -m modules.indexes ensure
+
+Databases created before department scoping are upgraded once, by an
+operator, before the indexes are ensured. The command is safe to re-run:
+
+    python -m modules.indexes migrate
+"""
+import argparse
+import json
+import logging
+import sys
+from bson import ObjectId
+from pymongo import ASCENDING
+from config import db
+from modules import job_runner, logging_setup, tenancy
+
+logger = logging.getLogger(__name__)
+
+DEPARTMENT = ('department', ASCENDING)
+
+# (collection, keys, options)
+INDEXES = [
+    ('faculty', [DEPARTMENT, ('name', ASCENDING)], {'name': 'department_name_unique', 'unique': True}),
+    ('labs', [DEPARTMENT, ('name', ASCENDING)], {'name': 'department_name_unique', 'unique': True}),
+    ('workload', [DEPARTMENT, ('faculty_id', ASCENDING)], {'name': 'department_faculty_id_unique', 'unique': True}),
+    ('subjects', [DEPARTMENT], {'name': 'department_unique', 'unique': True}),
+    ('class_structure', [DEPARTMENT], {'name': 'department_unique', 'unique': True}),
+    ('time_grid', [DEPARTMENT], {'name': 'department_unique', 'unique': True}),
+    ('master_lab_timetable', [DEPARTMENT, ('year', ASCENDING), ('semester', ASCENDING)], {'name': 'department_year_semester'}),
+    ('timetable', [DEPARTMENT, ('year', ASCENDING), ('sem', ASCENDING)], {'name': 'department_year_sem'}),
+    ('availability', [DEPARTMENT, ('resource_type', ASCENDING), ('name', ASCENDING)],
+     {'name': 'department_resource_unique', 'unique': True}),
+    ('generation_jobs', [('finished_at', ASCENDING)],
+     {'name': 'finished_at_ttl', 'expireAfterSeconds': job_runner.JOB_RETENTION_SECONDS}),
+]
+
+# Representative filters for the queries issued by the handlers: (label, collection, filter)
+HANDLER_QUERIES = [
+    ('faculty by name', 'faculty', tenancy.scoped({'name': 'diagnostics'})),
+    ('faculty by names', 'faculty', tenancy.scoped({'name': {'$in': ['diagnostics']}})),
+    ('labs by name', 'labs', tenancy.scoped({'name': 'diagnostics'})),
+    ('labs confirm', 'labs', tenancy.scoped({'name': {'$in': ['diagnostics']}})),
+    ('workload by faculty', 'workload', tenancy.scoped({'faculty_id': ObjectId()})),
+    ('workload snapshot', 'workload', tenancy.scoped()),
+    ('subjects snapshot', 'subjects', tenancy.scoped()),
+    ('class structure snapshot', 'class_structure', tenancy.scoped()),
+    ('time grid', 'time_grid', tenancy.scoped()),
+    ('master timetable by year/semester', 'master_lab_timetable', tenancy.scoped({'year': 'SY', 'semester': '1'})),
+    ('timetable by year/sem', 'timetable', tenancy.scoped({'year': 'SY', 'sem': '1'})),
+    ('availability by resource', 'availability', tenancy.scoped({'resource_type': 'lab', 'name': 'diagnostics'})),
+]
+
+
+def migrate_departments():
+    """
+    Assign documents written before department scoping to the default
+    department. Idempotent; only run explicitly with the 'migrate' command.
+    Returns the documents updated per collection.
+    """
+    migrated = {}
+    for collection_name in tenancy.COLLECTIONS:
+        result = db[collection_name].update_many(
+            {'department': {'$exists': False}},
+            {'$set': {'department': tenancy.DEFAULT_DEPARTMENT}}
+        )
+        if result.modified_count:
+            migrated[collection_name] = result.modified_count
+
+    if migrated:
+        logger.info("Moved legacy documents to department '%s': %s", tenancy.DEFAULT_DEPARTMENT, migrated)
+    return migrated
+
+
+class IndexSetupError(RuntimeError):
+    def __init__(self, failed):
+        super().__init__("Could not ensure indexes: " + "; ".join(f"{name}: {error}" for name, error in failed))
+        self.failed = failed
+
+
+def ensure_indexes():
+    """
+    Create every declared index; existing indexes are left untouched.
+    Returns the created index names. Raises IndexSetupError listing every
+    index that could not be built (e.g. duplicates violate a unique index);
+    duplicate checks in the handlers rely on these indexes existing.
+    """
+    created = []
+    failed = []
+    for collection_name, keys, options in INDEXES:
+        try:
+            created.append(f"{collection_name}.{db[collection_name].create_index(keys, **options)}")
+        except Exception as e:
+            logger.error("Could not ensure index %s on %s: %s", options.get('name'), collection_name, e)
+            failed.append((f"{collection_name}.{options.get('name')}", str(e)))
+
+    if failed:
+        raise IndexSetupError(failed)
+
+    logger.info("Ensured %d indexes", len(created))
+    return created
+
+
+def _plan_stages(plan):
+    """Yield every 'stage' name found anywhere in an explain() plan"""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+def explain_queries():
+    """Run explain() on each handler query and report its winning plan stages"""
+    report = []
+    for label, collection_name, query in HANDLER_QUERIES:
+        try:
+            explanation = db[collection_name].find(query).explain()
+            winning_plan = explanation.get('queryPlanner', {}).get('winningPlan', {})
+            stages = list(_plan_stages(winning_plan))
+            report.append({
+                'query': label,
+                'collection': collection_name,
+                'stages': stages,
+                'collection_scan': 'COLLSCAN' in stages
+            })
+        except Exception as e:
+            report.append({'query': label, 'collection': collection_name, 'error': str(e)})
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Index management and query plan checks")
+    parser.add_argument('command', choices=['ensure', 'explain', 'migrate'])
+    args = parser.parse_args(argv)
+    logging_setup.configure_logging()
+
+    if args.command == 'ensure':
+        try:
+            print(json.dumps(ensure_indexes(), indent=2))
+        except IndexSetupError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        return 0
+
+    if args.command == 'migrate':
+        print(json.dumps(migrate_departments(), indent=2))
+        return 0
+
+    report = explain_queries()
+    print(json.dumps(report, indent=2))
+
+    flagged = [r['query'] for r in report if r.get('collection_scan') or r.get('error')]
+    if flagged:
+        print(f"Collection scans or errors: {', '.join(flagged)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,279 @@
+"""
+Runs CPU-heavy timetable generation outside the web worker.
+
+Jobs execute in a process pool so a long search never holds the GIL of the
+process serving requests. Job state lives in the generation_jobs collection,
+so any web worker can answer a status poll. Set JOB_WORKERS=0 to run jobs in
+a background thread instead, for local development.
+
+Concurrency is budgeted per host, not per web worker: JOB_WORKERS jobs run at
+once on the whole host (each holds one of the host's slot locks while it
+runs) and every job gets GENERATION_CPUS / JOB_WORKERS cores for its
+component processes and CP-SAT threads. Pool processes are started with
+forkserver (spawn where unavailable) rather than forked from a threaded web
+worker, and open a small MongoDB pool of their own. Finished jobs expire
+after JOB_RETENTION_SECONDS.
+
+A task reports failure by raising, by returning a falsy value or by
+returning a dict with "status": "failed" (and an optional "reason"). If a
+worker process dies, the job is marked failed and the pool is replaced.
+"""
+import contextlib
+import functools
+import logging
+import multiprocessing
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+import config
+from config import db
+from modules import logging_setup, tenancy
+
+try:
+    import fcntl
+except ImportError:  # Windows: no host-wide slots, JOB_WORKERS=0 is the supported mode there
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # Jobs running at once on this host
+GENERATION_CPUS = int(os.getenv("GENERATION_CPUS", os.cpu_count() or 1))  # Cores generation may use on this host
+JOB_CPUS = max(1, GENERATION_CPUS // max(1, JOB_WORKERS))  # Cores for one job's processes and solver threads
+JOB_MONGO_POOL_SIZE = int(os.getenv("JOB_MONGO_POOL_SIZE", "4"))  # MongoDB connections per pool process
+JOB_SLOT_DIR = os.getenv("JOB_SLOT_DIR", os.path.join(tempfile.gettempdir(), "timetable-job-slots"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+SLOT_POLL_SECONDS = 0.5
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+jobs_collection = db['generation_jobs']
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _init_worker():
+    """Runs once in every pool process, before it takes a task"""
+    config.MONGO_MAX_POOL_SIZE = JOB_MONGO_POOL_SIZE
+    logging_setup.configure_logging()
+
+
+def process_pool(max_workers):
+    """
+    A ProcessPoolExecutor whose processes are not forked from the calling
+    (possibly multi-threaded) process
+    """
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(method),
+        initializer=_init_worker
+    )
+
+
+def _get_executor():
+    """Create the pool on first use, once per process (safe across Gunicorn forks)"""
+    global _executor, _executor_pid
+
+    pid = os.getpid()
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid:
+            if JOB_WORKERS > 0:
+                # Processes mostly wait for a host slot, so one per runnable job is enough
+                _executor = process_pool(JOB_WORKERS)
+            else:
+                _executor = ThreadPoolExecutor(max_workers=1)
+            _executor_pid = pid
+
+    return _executor
+
+
+def _discard_executor(executor):
+    """Drop a broken pool so the next submit starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def _submit(fn, *args):
+    """
+    Submit to the pool, replacing it once if an earlier worker crash broke it.
+    Returns (executor, future).
+    """
+    executor = _get_executor()
+    try:
+        return executor, executor.submit(fn, *args)
+    except BrokenProcessPool:
+        logger.warning("Job pool is broken, starting a new one")
+        _discard_executor(executor)
+        executor = _get_executor()
+        return executor, executor.submit(fn, *args)
+
+
+@contextlib.contextmanager
+def _host_slot():
+    """
+    Hold one of the host's JOB_WORKERS slots for the duration of the block,
+    waiting until one is free. Slots are file locks, so the OS releases the
+    slot of a process that dies.
+    """
+    if fcntl is None or JOB_WORKERS <= 0:
+        yield
+        return
+
+    os.makedirs(JOB_SLOT_DIR, exist_ok=True)
+    while True:
+        for index in range(JOB_WORKERS):
+            handle = open(os.path.join(JOB_SLOT_DIR, f"slot-{index}.lock"), 'a')
+            try:
+                fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                handle.close()
+                continue
+            try:
+                yield
+            finally:
+                handle.close()
+            return
+        time.sleep(SLOT_POLL_SECONDS)
+
+
+def _failure_reason(result):
+    """Why a task's return value counts as a failure, or None when it succeeded"""
+    if not result:
+        return "No timetable was generated"
+    if isinstance(result, dict) and result.get('status') == 'failed':
+        return result.get('reason') or "Task reported failure"
+    return None
+
+
+def _set_status(job_id, **fields):
+    fields['updated_at'] = datetime.now()
+    if fields.get('status') in FINISHED_STATUSES:
+        fields['finished_at'] = fields['updated_at']  # starts the TTL clock
+    jobs_collection.update_one({'_id': job_id}, {'$set': fields})
+
+
+def _run(job_id, task, params, log_context):
+    """Executed inside the pool: run the task and record its outcome"""
+    tokens = logging_setup.bind(**log_context)
+    try:
+        with _host_slot():
+            _set_status(job_id, status='running')
+            result = task(params)
+        reason = _failure_reason(result)
+        if reason:
+            _set_status(job_id, status='failed', error=reason, result=result)
+        else:
+            _set_status(job_id, status='succeeded', result=result)
+        return result
+    except Exception as e:
+        logger.error("Job %s (%s) failed: %s", job_id, task.__name__, e, exc_info=True)
+        _set_status(job_id, status='failed', error=str(e))
+        raise
+    finally:
+        logging_setup.reset(tokens)
+
+
+def _on_done(job_id, executor, future):
+    """Runs in the submitting process: record jobs whose worker process died"""
+    if future.cancelled() or not isinstance(future.exception(), BrokenProcessPool):
+        return
+
+    logger.error("Job %s failed: its worker process exited unexpectedly", job_id)
+    try:
+        _set_status(job_id, status='failed', error="Worker process exited unexpectedly")
+    except Exception as e:
+        logger.error("Could not mark job %s as failed: %s", job_id, e)
+
+    _discard_executor(executor)
+
+
+def _call(task, params, log_context):
+    """Executed inside the pool for run_many: run the task under the caller's log context"""
+    tokens = logging_setup.bind(**log_context)
+    try:
+        with _host_slot():
+            return task(params)
+    finally:
+        logging_setup.reset(tokens)
+
+
+def submit(task, params):
+    """
+    Queue a job and return (job_id, future).
+    task must be a module-level function taking one params dict and returning
+    a JSON-serialisable result, so it can be sent to a worker process.
+    """
+    kind = task.__name__.lstrip('_')
+    job_id = uuid.uuid4().hex
+    now = datetime.now()
+    jobs_collection.insert_one({
+        '_id': job_id,
+        'kind': kind,
+        'department': tenancy.current_department(),
+        'request_id': logging_setup.request_id(),
+        'params': params,
+        'host': socket.gethostname(),
+        'status': 'queued',
+        'created_at': now,
+        'updated_at': now
+    })
+
+    # The job logs under the id of the request that queued it
+    executor, future = _submit(_run, job_id, task, params, logging_setup.current())
+    future.add_done_callback(functools.partial(_on_done, job_id, executor))
+    return job_id, future
+
+
+def run(task, params, timeout=None):
+    """Run a job in the pool and wait for its result"""
+    _, future = submit(task, params)
+    return future.result(timeout=timeout)
+
+
+def run_many(task, params_list, timeout=None):
+    """
+    Run task once per params dict in the pool and return the results in order.
+    Nothing is recorded in generation_jobs; use this for read-only work.
+    """
+    log_context = logging_setup.current()
+    futures = [_submit(_call, task, params, log_context)[1] for params in params_list]
+    return [future.result(timeout=timeout) for future in futures]
+
+
+def fail_orphaned_jobs():
+    """
+    Mark this host's queued and running jobs as failed. Call before any job
+    pool on the host starts (gunicorn on_starting): no process that could
+    still finish them exists. Returns the number of jobs marked.
+    """
+    now = datetime.now()
+    result = jobs_collection.update_many(
+        {'host': socket.gethostname(), 'status': {'$in': ['queued', 'running']}},
+        {'$set': {
+            'status': 'failed',
+            'error': "Server restarted before the job finished",
+            'updated_at': now,
+            'finished_at': now
+        }}
+    )
+    if result.modified_count:
+        logger.warning("Marked %d unfinished jobs from a previous run as failed", result.modified_count)
+    return result.modified_count
+
+
+def get_job(job_id, department=None):
+    """Return the stored job document (without params) or None; department restricts the lookup"""
+    query = {'_id': job_id}
+    if department:
+        query = tenancy.scoped(query, department)
+    return jobs_collection.find_one(query, {'params': 0})
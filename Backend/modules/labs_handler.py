@@ -1,13 +1,22 @@
 from flask import jsonify
+from pymongo.errors import DuplicateKeyError
 from config import db
+from modules import bulk_operations, tenancy
 
 # Collection for labs
 labs_collection = db['labs']
 
+# Fields a client may change through update; department and _id are never writable
+LAB_FIELDS = {
+    'name': str,
+    'short_name': str,
+    'confirmed': bool
+}
+
 # ---------- Display all labs ----------
 def display_labs():
     try:
-        labs = list(labs_collection.find({}, {'_id': 0}))
+        labs = list(labs_collection.find(tenancy.scoped(), {'_id': 0, 'department': 0}))
         return jsonify(labs)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -22,15 +31,15 @@ def add_lab(data):
         return jsonify({"error": "Missing name or short_name"}), 400
 
     # Check if lab already exists
-    existing = labs_collection.find_one({"name": name})
+    existing = labs_collection.find_one(tenancy.scoped({"name": name}))
     if existing:
         return jsonify({"error": f"Lab '{name}' already exists"}), 400
 
     try:
-        labs_collection.insert_one({
+        labs_collection.insert_one(tenancy.stamp({
             "name": name,
             "short_name": short_name
-        })
+        }))
         return jsonify({"message": f"Lab '{name}' added successfully!"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -44,7 +53,7 @@ def delete_lab(data):
         return jsonify({"error": "Missing name"}), 400
 
     try:
-        result = labs_collection.delete_one({"name": name})
+        result = labs_collection.delete_one(tenancy.scoped({"name": name}))
         if result.deleted_count == 0:
             return jsonify({"error": f"Lab '{name}' not found"}), 404
         return jsonify({"message": f"Lab '{name}' deleted successfully!"})
@@ -60,11 +69,17 @@ def update_lab(data):
     if not name or not updates:
         return jsonify({"error": "Missing name or updates"}), 400
 
+    error = bulk_operations.update_error(updates, LAB_FIELDS)
+    if error:
+        return jsonify({"error": error}), 400
+
     try:
-        result = labs_collection.update_one({"name": name}, {"$set": updates})
+        result = labs_collection.update_one(tenancy.scoped({"name": name}), {"$set": updates})
         if result.matched_count == 0:
             return jsonify({"error": f"Lab '{name}' not found"}), 404
         return jsonify({"message": f"Lab '{name}' updated successfully!"})
+    except DuplicateKeyError:
+        return jsonify({"error": f"Lab '{updates['name']}' already exists"}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -82,7 +97,7 @@ def confirm_labs(data):
 
     try:
         result = labs_collection.update_many(
-            {"name": {"$in": lab_names}},
+            tenancy.scoped({"name": {"$in": lab_names}}),
             {"$set": {"confirmed": True}}
         )
         return jsonify({
@@ -90,3 +105,34 @@ def confirm_labs(data):
         })
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+
+# ---------- Bulk add / update / delete ----------
+def bulk_labs(data):
+    """
+    Apply one action to many lab records in a single request.
+    Expected data:
+    {
+        "action": "add",
+        "labs": [{"name": "...", "short_name": "..."}, ...]
+    }
+    For "update" each item is {"name": "...", "updates": {...}},
+    for "delete" each item is a name or {"name": "..."}.
+    """
+    action = data.get('action', '').lower()
+    items = data.get('labs')
+
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "Missing labs list"}), 400
+
+    try:
+        if action == 'add':
+            return jsonify(bulk_operations.bulk_add_named(labs_collection, items, "Lab"))
+        elif action == 'update':
+            return jsonify(bulk_operations.bulk_update_named(labs_collection, items, "Lab", LAB_FIELDS))
+        elif action == 'delete':
+            return jsonify(bulk_operations.bulk_delete_named(labs_collection, items, "Lab"))
+        else:
+            return jsonify({"error": "Invalid action"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,134 @@
+"""
+Structured logging with a per-request correlation id.
+
+Records are written one JSON object per line (LOG_FORMAT=text for plain
+lines). Every record carries the request_id of the request or job it belongs
+to, and fields passed with extra={...} become JSON keys. Log calls use lazy
+%-style arguments, so nothing is formatted unless the record is emitted.
+
+Debug tracing of the timetable search is switched on per request with the
+X-Debug-Trace: 1 header, or for a random share of requests with
+TRACE_SAMPLE_RATE. Trace records go to the 'trace.*' loggers. Code in hot
+loops reads tracing() once and guards each trace call with that bool, so
+a disabled trace costs one branch.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # 'json' or 'text'
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0"))  # share of requests traced without the header
+TRACE_EVERY = max(1, int(os.getenv("TRACE_EVERY", "1")))  # log every Nth search decision while tracing
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+TRACE_HEADER = 'X-Debug-Trace'
+TRACE_LOGGER = 'trace'
+REQUEST_ID_PATTERN = re.compile(r'^[A-Za-z0-9._:-]{1,128}$')
+
+_request_id = contextvars.ContextVar('request_id', default=None)
+_trace = contextvars.ContextVar('trace', default=False)
+
+# Attributes every LogRecord has; anything else was passed with extra={...}
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'request_id'}
+
+_configured = False
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp each record with the correlation id of the current context"""
+
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None)
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    """Install the root handler; safe to call more than once per process"""
+    global _configured
+    if _configured:
+        return
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.addFilter(RequestIdFilter())
+    if LOG_FORMAT == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s'))
+
+    root = logging.getLogger()
+    root.addHandler(handler)
+    root.setLevel(LOG_LEVEL)
+
+    # Trace records are only produced when tracing() is on, so let them through
+    logging.getLogger(TRACE_LOGGER).setLevel(logging.DEBUG)
+    _configured = True
+
+
+def get_tracer(name):
+    """Logger for the debug trace of a module"""
+    return logging.getLogger(f"{TRACE_LOGGER}.{name}")
+
+
+# ---------- Correlation context ----------
+def new_request_id():
+    return uuid.uuid4().hex
+
+
+def clean_request_id(value):
+    """Return an incoming request id if it is safe to log and echo, else None"""
+    if isinstance(value, str) and REQUEST_ID_PATTERN.match(value):
+        return value
+    return None
+
+
+def sample_trace(requested=False):
+    """Decide whether to trace this request"""
+    return bool(requested) or (TRACE_SAMPLE_RATE > 0 and random.random() < TRACE_SAMPLE_RATE)
+
+
+def bind(request_id=None, trace=False):
+    """Set the context for this thread/task; returns tokens for reset()"""
+    return _request_id.set(request_id), _trace.set(bool(trace))
+
+
+def reset(tokens):
+    request_token, trace_token = tokens
+    _request_id.reset(request_token)
+    _trace.reset(trace_token)
+
+
+def current():
+    """The context to hand to a job so its logs keep the request's id"""
+    return {'request_id': _request_id.get(), 'trace': _trace.get()}
+
+
+def request_id():
+    return _request_id.get()
+
+
+def tracing():
+    return _trace.get()
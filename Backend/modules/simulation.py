@@ -0,0 +1,204 @@
+"""
+What-if simulation of the practical timetable.
+
+A scenario is an overlay of changes applied to an in-memory copy of the
+generator inputs (see timetable_generator.load_snapshot). The copy is solved
+with the same engine, and the result is scored. Nothing is written to the
+database, so many scenarios can be run side by side.
+
+Overlay format (every key is optional):
+{
+    "labs": {"add": [{"name": "Lab 9", "short_name": "L9"}], "remove": ["Lab 2"]},
+    "faculty": {"add": [{"name": "Dr. New", "short_name": "DN"}], "remove": ["Dr. X"]},
+    "workload": [{"faculty_name": "Dr. Aditi", "subjects": [...]}],
+    "availability": [{"resource_type": "faculty", "name": "Dr. Y", "unavailable": [...]}],
+    "subjects": {...},            (replaces the subjects document)
+    "class_structure": {...},     (replaces the class structure document)
+    "time_grid": {"days": [...], "slots": [...]}
+}
+A workload entry replaces that faculty's workload; an empty subjects list
+removes it (e.g. the faculty goes part-time or is on leave).
+"""
+import copy
+from bson import ObjectId
+from modules import timetable_generator, timetable_metrics
+
+YEARS = ['SY', 'TY', 'BE']
+YEAR_KEYS = [year.lower() for year in YEARS]  # keys of the subjects and class structure documents
+OVERLAY_KEYS = ['labs', 'faculty', 'workload', 'availability', 'subjects', 'class_structure', 'time_grid']
+
+
+def years_error(years):
+    """Error message unless years is a non-empty list of YEARS, else None"""
+    if not isinstance(years, list) or not years or any(year not in YEARS for year in years):
+        return f"'years' must be a non-empty list of {', '.join(YEARS)}"
+    return None
+
+
+def _check_year_keys(doc, label):
+    """Year-keyed overlay documents may only use the keys the generator reads"""
+    if not isinstance(doc, dict):
+        raise ValueError(f"'{label}' must be an object keyed by {', '.join(YEAR_KEYS)}")
+    unknown = [key for key in doc if key not in YEAR_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown years in '{label}': {', '.join(map(str, unknown))}; "
+                         f"expected {', '.join(YEAR_KEYS)}")
+
+
+def _names(items, label):
+    """Accept plain names or {"name": ...} objects"""
+    names = []
+    for item in items or []:
+        name = item.get('name') if isinstance(item, dict) else item
+        if not name:
+            raise ValueError(f"{label} entries need a name")
+        names.append(name)
+    return names
+
+
+def _apply_resources(current, changes, label):
+    """Remove then add named records; returns the new list"""
+    if not isinstance(changes, dict):
+        raise ValueError(f"'{label}' overlay must be an object with 'add' and/or 'remove'")
+
+    existing = {item['name'] for item in current}
+    removed = set(_names(changes.get('remove'), label))
+    missing = sorted(name for name in removed if name not in existing)
+    if missing:
+        raise ValueError(f"Cannot remove unknown {label} {', '.join(missing)}")
+
+    result = [item for item in current if item['name'] not in removed]
+    remaining = {item['name'] for item in result}
+
+    for item in changes.get('add') or []:
+        if not isinstance(item, dict) or not item.get('name'):
+            raise ValueError(f"{label} to add need a name")
+        if item['name'] in remaining:
+            raise ValueError(f"{label} '{item['name']}' already exists")
+        remaining.add(item['name'])
+        result.append(dict(item))
+
+    return result
+
+
+def apply_overlay(snapshot, overlay):
+    """
+    Return a copy of snapshot with the overlay applied; the snapshot is not modified.
+    Raises ValueError for an overlay that does not match the snapshot.
+    """
+    overlay = overlay or {}
+    if not isinstance(overlay, dict):
+        raise ValueError("Overlay must be an object")
+
+    unknown = [key for key in overlay if key not in OVERLAY_KEYS]
+    if unknown:
+        raise ValueError(f"Unknown overlay keys: {', '.join(unknown)}")
+
+    result = copy.deepcopy(snapshot)
+
+    # Labs
+    if 'labs' in overlay:
+        result['labs'] = _apply_resources(result['labs'], overlay['labs'], 'lab')
+
+    # Faculty; removed faculty lose their workload, new faculty get a fresh id
+    if 'faculty' in overlay:
+        faculty = _apply_resources(result['faculty'], overlay['faculty'], 'faculty')
+        for member in faculty:
+            member.setdefault('_id', ObjectId())
+        result['faculty'] = [{'_id': member['_id'], 'name': member['name']} for member in faculty]
+
+        kept_ids = {str(member['_id']) for member in result['faculty']}
+        result['workload'] = [w for w in result['workload'] if str(w.get('faculty_id')) in kept_ids]
+
+    # Workload replacements by faculty name
+    if 'workload' in overlay:
+        faculty_ids = {member['name']: member['_id'] for member in result['faculty']}
+        for entry in overlay['workload'] or []:
+            name = entry.get('faculty_name') if isinstance(entry, dict) else None
+            if name not in faculty_ids:
+                raise ValueError(f"Workload given for unknown faculty '{name}'")
+
+            for subject in entry.get('subjects') or []:
+                if not isinstance(subject, dict) or subject.get('year') not in YEARS:
+                    raise ValueError(f"Workload of '{name}' has an entry without a year from {', '.join(YEARS)}")
+
+            faculty_id = faculty_ids[name]
+            result['workload'] = [w for w in result['workload'] if str(w.get('faculty_id')) != str(faculty_id)]
+            if entry.get('subjects'):
+                result['workload'].append({'faculty_id': faculty_id, 'subjects': entry['subjects']})
+
+    # Availability calendars, replaced per (resource_type, name)
+    if 'availability' in overlay:
+        calendars = {
+            (calendar.get('resource_type'), calendar.get('name')): calendar
+            for calendar in result['availability']
+        }
+        for calendar in overlay['availability'] or []:
+            if not isinstance(calendar, dict) or not calendar.get('resource_type') or not calendar.get('name'):
+                raise ValueError("Availability entries need resource_type and name")
+            calendars[(calendar['resource_type'], calendar['name'])] = calendar
+        result['availability'] = list(calendars.values())
+
+    # Whole-document replacements
+    if 'subjects' in overlay:
+        subjects = overlay['subjects']
+        _check_year_keys(subjects.get('year') if isinstance(subjects, dict) else None, 'subjects.year')
+    if 'class_structure' in overlay:
+        _check_year_keys(overlay['class_structure'], 'class_structure')
+    for key in ['subjects', 'class_structure', 'time_grid']:
+        if key in overlay:
+            result[key] = overlay[key]
+
+    return result
+
+
+def _metrics(schedule):
+    try:
+        return timetable_metrics.score_schedule(schedule)
+    except RuntimeError:  # NumPy not installed
+        return None
+
+
+def run_scenario(params):
+    """
+    Job: solve one scenario for each requested year without saving anything.
+    params holds name, snapshot (overlay already applied), sem, years and the
+    generator options; returns a JSON-serialisable summary. Raises ValueError
+    for years outside YEARS.
+    """
+    years = params.get('years', YEARS)
+    error = years_error(years)
+    if error:
+        raise ValueError(error)
+
+    results = []
+    for year in years:
+        generator = timetable_generator.PracticalTimetableGenerator(
+            year, params['sem'],
+            backend=params.get('backend', 'backtracking'),
+            time_limit=params.get('time_limit'),
+            num_workers=params.get('num_workers'),
+            snapshot=params['snapshot']
+        )
+        timetable = generator.generate()
+        report = generator.feasibility_report
+
+        result = {
+            "year": year,
+            "status": "success" if timetable else "failed",
+            "feasible": report['feasible'] if report else None,
+            "bottlenecks": report['bottlenecks'] if report else [],
+            "solver_stats": generator.solver_stats
+        }
+
+        if timetable:
+            result["total_assignments"] = len(generator.assignments)
+            result["metrics"] = _metrics(timetable)
+            if params.get('include_timetable'):
+                result["timetable"] = timetable
+        elif not report:
+            result["reason"] = "No practicals, labs, faculties, workload or class structure found"
+
+        results.append(result)
+
+    return {"name": params.get('name'), "years": results}
@@ -1,12 +1,43 @@
 from flask import jsonify
 from config import db
+from modules import tenancy, versioning
+from modules.timetable_generator import practical_hours_error
 
 # Collection for subjects
 subjects_collection = db['subjects']
 
-def save_subjects(data):
+
+def _year_error(year):
+    """Error message for the year-keyed subject lists, or None when every subject is valid"""
+    if not isinstance(year, dict) or not all(isinstance(subjects, list) for subjects in year.values()):
+        return "'year' must map year keys to lists of subjects"
+    for year_key, subjects in year.items():
+        for subject in subjects:
+            if not isinstance(subject, dict):
+                return f"Every subject in '{year_key}' must be an object"
+            error = practical_hours_error(subject.get("hrs_per_week_practical", 0), "hrs_per_week_practical")
+            if error:
+                return f"{year_key} {subject.get('name', '')}: {error}"
+    return None
+
+
+def get_subjects():
+    """Return the department's subjects document with its version (also sent as the ETag)"""
+    try:
+        doc = subjects_collection.find_one(tenancy.scoped(), {'_id': 0, 'department': 0, 'updated_at': 0})
+        if not doc:
+            return jsonify({"error": "No subjects saved"}), 404
+
+        return versioning.with_etag(jsonify(doc), versioning.version_of(doc))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def save_subjects(data, if_match=None):
     """
-    Saves subjects by first deleting existing subjects and then inserting new ones.
+    Saves the department's subjects, replacing its subjects document in place.
+    Send the version from GET as If-Match to reject the save (412) when
+    someone else saved in between.
     Expected data format:
     {
         "year": {
@@ -23,14 +54,23 @@ def save_subjects(data):
     if not data or "year" not in data:
         return jsonify({"error": "Missing 'year' data"}), 400
 
+    year_error = _year_error(data["year"])
+    if year_error:
+        return jsonify({"error": year_error}), 400
+
     try:
-        # Delete existing subjects
-        subjects_collection.delete_many({})
+        expected = versioning.parse_if_match(if_match)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-        # Insert new subjects
-        subjects_collection.insert_one(data)
+    try:
+        version = versioning.save(subjects_collection, tenancy.scoped(), {"year": data["year"]}, expected)
 
-        return jsonify({"message": "Subjects saved successfully!"})
+        return versioning.with_etag(jsonify({"message": "Subjects saved successfully!", "version": version}), version)
 
+    except versioning.VersionConflict as e:
+        return versioning.with_etag(
+            jsonify({"error": str(e), "current_version": e.current_version}), e.current_version
+        ), 412
     except Exception as e:
         return jsonify({"error": str(e)}), 500
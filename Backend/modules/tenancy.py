@@ -0,0 +1,64 @@
+"""
+Department (tenant) scoping.
+
+Every document carries a 'department' key and every query filters on it, so
+departments sharing one deployment never read or overwrite each other's
+data. A request's department comes from the X-Department header, the
+'department' query parameter or the 'department' body field (in that order)
+and defaults to DEFAULT_DEPARTMENT. Handlers read it with current_department();
+jobs that run outside the request are given it explicitly.
+"""
+import contextvars
+import os
+import re
+
+DEPARTMENT_HEADER = 'X-Department'
+DEFAULT_DEPARTMENT = os.getenv("DEFAULT_DEPARTMENT", "default")
+DEPARTMENT_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# Collections whose documents belong to a department
+COLLECTIONS = [
+    'subjects',
+    'class_structure',
+    'faculty',
+    'labs',
+    'workload',
+    'master_lab_timetable',
+    'timetable',
+    'time_grid',
+    'availability',
+    'generation_jobs',
+]
+
+_department = contextvars.ContextVar('department', default=DEFAULT_DEPARTMENT)
+
+
+def resolve(header=None, query=None, body=None):
+    """Pick the request's department; raises ValueError for a malformed key"""
+    department = header or query or body or DEFAULT_DEPARTMENT
+    if not isinstance(department, str) or not DEPARTMENT_PATTERN.match(department):
+        raise ValueError("Department must be 1-64 letters, digits, '-' or '_'")
+    return department
+
+
+def bind(department):
+    """Set the department for this thread/task; returns a token for reset()"""
+    return _department.set(department)
+
+
+def reset(token):
+    _department.reset(token)
+
+
+def current_department():
+    return _department.get()
+
+
+def scoped(query=None, department=None):
+    """Copy of a filter restricted to the department (the current one by default)"""
+    return {**(query or {}), 'department': department or current_department()}
+
+
+def stamp(doc, department=None):
+    """Copy of a document tagged with the department (the current one by default)"""
+    return {**doc, 'department': department or current_department()}
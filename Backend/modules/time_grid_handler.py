@@ -0,0 +1,152 @@
+import re
+from flask import jsonify
+from pymongo import ReplaceOne
+from config import db
+from modules import tenancy
+from modules.timetable_generator import HOURS_PER_SLOT, SLOTS
+
+time_grid_collection = db['time_grid']
+availability_collection = db['availability']
+
+WEEKDAY_NAMES = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+RESOURCE_TYPES = ['lab', 'faculty']
+SLOT_PATTERN = re.compile(r'^([01]\d|2[0-3]):[0-5]\d$')
+SLOT_MINUTES = HOURS_PER_SLOT * 60  # Length of every slot, as assumed by the generator and the exports
+
+
+def _minutes(slot):
+    hour, minute = slot.split(':')
+    return int(hour) * 60 + int(minute)
+
+
+# ---------- Time grid ----------
+def get_time_grid():
+    """Return the stored time grid, or an empty object when the defaults are in use"""
+    try:
+        grid = time_grid_collection.find_one(tenancy.scoped(), {'_id': 0, 'department': 0})
+        return jsonify(grid or {})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def save_time_grid(data):
+    """
+    Saves the teaching days and practical slot start times.
+    Expected data format:
+    {
+        "days": ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"],
+        "slots": ["09:00", "11:15", "14:15", "16:20"]
+    }
+    Slots must be in chronological order; consecutive slots count as contiguous.
+    Every slot lasts SLOT_MINUTES, so each must start at least that long after
+    the previous one and end by midnight.
+    """
+    days = data.get('days') if data else None
+    slots = data.get('slots') if data else None
+
+    if not days or not slots:
+        return jsonify({"error": "Missing days or slots"}), 400
+
+    if any(day not in WEEKDAY_NAMES for day in days) or len(set(days)) != len(days):
+        return jsonify({"error": f"Days must be distinct values from {', '.join(WEEKDAY_NAMES)}"}), 400
+
+    if any(not isinstance(slot, str) or not SLOT_PATTERN.match(slot) for slot in slots):
+        return jsonify({"error": "Slots must be HH:MM start times"}), 400
+
+    if slots != sorted(set(slots)):
+        return jsonify({"error": "Slots must be distinct and in chronological order"}), 400
+
+    starts = [_minutes(slot) for slot in slots]
+    for previous, slot, start in zip(slots, slots[1:], starts[1:]):
+        if start - _minutes(previous) < SLOT_MINUTES:
+            return jsonify({"error": f"Slot {slot} overlaps {previous}; slots last {SLOT_MINUTES} minutes"}), 400
+    if starts[-1] + SLOT_MINUTES > 24 * 60:
+        return jsonify({"error": f"Slot {slots[-1]} would end after midnight; slots last {SLOT_MINUTES} minutes"}), 400
+
+    days = sorted(days, key=WEEKDAY_NAMES.index)
+
+    try:
+        time_grid_collection.replace_one(tenancy.scoped(), tenancy.stamp({"days": days, "slots": slots}), upsert=True)
+        return jsonify({"message": "Time grid saved successfully!"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# ---------- Availability calendars ----------
+def get_availability():
+    """Return the unavailability calendar of every lab and faculty"""
+    try:
+        calendars = list(availability_collection.find(tenancy.scoped(), {'_id': 0, 'department': 0}))
+        return jsonify(calendars)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def save_availability(data):
+    """
+    Replace the unavailability calendars of one or more labs/faculties.
+    An entry without "slot" blocks the whole day; an empty list clears the calendar.
+    A slot must be one of the configured time grid slots.
+    Expected data format:
+    {
+        "calendars": [
+            {
+                "resource_type": "lab",
+                "name": "Lab 1",
+                "unavailable": [{"day": "Friday"}, {"day": "Monday", "slot": "11:15"}]
+            },
+            {"resource_type": "faculty", "name": "Dr. Aditi", "unavailable": [...]}
+        ]
+    }
+    """
+    calendars = data.get('calendars') if data else None
+
+    if not isinstance(calendars, list) or not calendars:
+        return jsonify({"error": "Missing calendars list"}), 400
+
+    try:
+        grid = time_grid_collection.find_one(tenancy.scoped(), {'slots': 1})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    grid_slots = (grid or {}).get('slots') or SLOTS
+
+    operations = []
+    for index, calendar in enumerate(calendars):
+        resource_type = calendar.get('resource_type') if isinstance(calendar, dict) else None
+        name = calendar.get('name') if isinstance(calendar, dict) else None
+        unavailable = calendar.get('unavailable', []) if isinstance(calendar, dict) else None
+
+        if resource_type not in RESOURCE_TYPES or not name:
+            return jsonify({"error": f"Calendar {index}: resource_type must be lab or faculty and name is required"}), 400
+
+        if not isinstance(unavailable, list) or any(
+            not isinstance(entry, dict) or entry.get('day') not in WEEKDAY_NAMES for entry in unavailable
+        ):
+            return jsonify({"error": f"Calendar {index}: every unavailable entry needs a valid day"}), 400
+
+        off_grid = [
+            entry['slot'] for entry in unavailable
+            if entry.get('slot') and (not isinstance(entry['slot'], str) or not SLOT_PATTERN.match(entry['slot'])
+                                      or entry['slot'] not in grid_slots)
+        ]
+        if off_grid:
+            return jsonify({
+                "error": f"Calendar {index}: slots must be time grid start times ({', '.join(grid_slots)}), "
+                         f"got {', '.join(map(str, off_grid))}"
+            }), 400
+
+        blocks = [
+            {"day": entry['day'], "slot": entry['slot']} if entry.get('slot') else {"day": entry['day']}
+            for entry in unavailable
+        ]
+        operations.append(ReplaceOne(
+            tenancy.scoped({"resource_type": resource_type, "name": name}),
+            tenancy.stamp({"resource_type": resource_type, "name": name, "unavailable": blocks}),
+            upsert=True
+        ))
+
+    try:
+        availability_collection.bulk_write(operations, ordered=False)
+        return jsonify({"message": f"{len(operations)} availability calendars saved successfully!"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,15 +1,28 @@
 from datetime import datetime
+import math
+import os
+import threading
+import time
+from pymongo import ReturnDocument
 from config import db
+from modules import feasibility, cp_solver, job_runner, logging_setup, tenancy, versioning
 import logging
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+tracer = logging_setup.get_tracer(__name__)
 
-# Constants
+# Constants (default time grid, overridden by the stored time_grid document)
 DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday']
 SLOTS = ['11:15', '14:15', '16:20']  # 11:15 AM, 2:15 PM, 4:20 PM
 MIN_PRACTICAL_HOURS = 2  # Only practicals with 2+ hours go to labs
+HOURS_PER_SLOT = 2  # Each slot is one 2-hour lab session
+GENERATOR_WORKERS = int(os.getenv("GENERATOR_WORKERS", job_runner.JOB_CPUS))  # Parallel sub-problem solves
+BACKENDS = ['backtracking', 'cpsat']
+SNAPSHOT_ATTEMPTS = 5  # Re-reads allowed when configuration changes while loading
+
+_component_pool = None
+_component_pool_pid = None
+_component_pool_lock = threading.Lock()
 
 # Database collections
 subjects_collection = db['subjects']
@@ -18,70 +31,193 @@ labs_collection = db['labs']
 class_structure_collection = db['class_structure']
 workload_collection = db['workload']
 master_lab_timetable_collection = db['master_lab_timetable']
+time_grid_collection = db['time_grid']
+availability_collection = db['availability']
 
 
 class PracticalTimetableGenerator:
-    def __init__(self, year, semester):
+    def __init__(self, year, semester, backend='backtracking', time_limit=None, num_workers=None, snapshot=None,
+                 department=tenancy.DEFAULT_DEPARTMENT):
         self.year = year  # 'SY', 'TY', 'BE'
         self.semester = semester  # '1' or '2'
+        self.department = department  # every read and write is scoped to this department
+        self.snapshot = snapshot  # input data, see load_snapshot(); loaded on first use when None
+        self.backend = backend  # 'backtracking' or 'cpsat'
+        self.time_limit = time_limit or cp_solver.DEFAULT_TIME_LIMIT_SECONDS
+        # CP-SAT threads stay within the job's share of the host's cores
+        self.num_workers = min(num_workers or cp_solver.DEFAULT_NUM_WORKERS, job_runner.JOB_CPUS)
         self.timetable = {}
         self.assignments = []
+        self.feasibility_report = None
+        self.solver_stats = {}
+        self.trace = logging_setup.tracing()  # read once; guards every trace call in the search
+        self._trace_count = 0
+        self._set_time_grid(DAYS, SLOTS, {}, {})
         
     def generate(self):
         """Main generation method"""
         try:
-            logger.info(f"Generating timetable for {self.year} Sem {self.semester}")
+            logger.info("Generating timetable for %s Sem %s", self.year, self.semester)
             
-            # Phase 1: Load and validate data
-            practicals = self._load_practicals()
-            if not practicals:
-                logger.warning(f"No practicals found for {self.year}")
+            # Phases 1-3: Load data, resources and batch assignments
+            inputs = self._prepare_inputs()
+            if not inputs:
                 return None
             
-            logger.info(f"Found {len(practicals)} practicals")
-            
-            # Phase 2: Get available resources
-            labs = self._get_available_labs()
-            faculties = self._get_all_faculties()
-            faculty_subjects_map = self._get_faculty_subjects_mapping(practicals)
+            batch_assignments, labs, faculties, faculty_subjects_map = inputs
             
-            if not labs or not faculties or not faculty_subjects_map:
-                logger.error("Missing labs, faculties, or faculty-subject mapping")
-                logger.error(f"Labs: {len(labs)}, Faculties: {len(faculties)}, Faculty-Subject Map: {len(faculty_subjects_map)}")
+            # Phase 4: Pre-solve feasibility analysis
+            self.feasibility_report = self._analyse_feasibility(
+                batch_assignments, labs, faculties, faculty_subjects_map
+            )
+            if not self.feasibility_report['feasible']:
+                for bottleneck in self.feasibility_report['bottlenecks']:
+                    logger.error("Infeasible: %s - %s", bottleneck['check'], bottleneck['detail'])
                 return None
             
-            logger.info(f"Found {len(labs)} labs and {len(faculties)} faculties")
-            logger.info(f"Faculty-Subject mapping has {len(faculty_subjects_map)} entries")
-            
-            # Phase 3: Prepare batch assignments
-            batch_assignments = self._prepare_batch_assignments(practicals)
-            logger.info(f"Created {len(batch_assignments)} batch assignments")
-            
-            if not batch_assignments:
-                logger.warning("No batch assignments created")
-                return None
-            
-            # Phase 4: Initialize timetable structure
+            # Phase 5: Initialize timetable structure
             self._initialize_timetable(labs)
             
-            # Phase 5: Backtrack search to assign practicals
-            success = self._backtrack_assign(batch_assignments, labs, faculties, faculty_subjects_map, 0)
+            # Phase 6: Search with the selected backend
+            started = time.perf_counter()
+            if self.backend == 'cpsat':
+                success = self._solve_cp(batch_assignments, labs, faculties, faculty_subjects_map)
+            else:
+                # Split into independent sub-problems where possible
+                success = self._solve(batch_assignments, labs, faculties, faculty_subjects_map)
+                self.solver_stats = {
+                    "backend": "backtracking",
+                    "status": "FEASIBLE" if success else "EXHAUSTED",
+                    "wall_time_seconds": round(time.perf_counter() - started, 4)
+                }
+            
+            self.timetable['solver_stats'] = self.solver_stats
+            self.timetable['config_versions'] = self.snapshot.get('config_versions')
             
             if success:
                 logger.info("Timetable generated successfully")
                 return self.timetable
             else:
-                logger.error("Failed to generate valid timetable - backtracking exhausted")
+                logger.error("Failed to generate valid timetable - %s search status %s", self.backend, self.solver_stats.get('status'))
                 return None
                 
         except Exception as e:
-            logger.error(f"Error generating timetable: {str(e)}", exc_info=True)
+            logger.error("Error generating timetable: %s", e, exc_info=True)
+            return None
+    
+    def check_feasibility(self):
+        """Run only the loading phases and the pre-solve analysis"""
+        try:
+            inputs = self._prepare_inputs()
+            if not inputs:
+                return {
+                    "feasible": False,
+                    "error": "No practicals, labs, faculties, workload or class structure found"
+                }
+            
+            self.feasibility_report = self._analyse_feasibility(*inputs)
+            return self.feasibility_report
+        except Exception as e:
+            logger.error("Error checking feasibility: %s", e, exc_info=True)
+            return {"feasible": False, "error": str(e)}
+    
+    def _prepare_inputs(self):
+        """Load practicals, resources and batch assignments; None if anything is missing"""
+        # Phase 0: One read of all inputs, then time grid and availability calendars
+        if self.snapshot is None:
+            self.snapshot = load_snapshot(self.department)
+        self._load_time_grid()
+        
+        # Phase 1: Load and validate data
+        practicals = self._load_practicals()
+        if not practicals:
+            logger.warning("No practicals found for %s", self.year)
             return None
+        
+        logger.info("Found %d practicals", len(practicals))
+        
+        # Phase 2: Get available resources
+        labs = self._get_available_labs()
+        faculties = self._get_all_faculties()
+        faculty_subjects_map = self._get_faculty_subjects_mapping(practicals)
+        
+        if not labs or not faculties or not faculty_subjects_map:
+            logger.error("Missing labs, faculties, or faculty-subject mapping")
+            logger.error("Labs: %d, Faculties: %d, Faculty-Subject Map: %d", len(labs), len(faculties), len(faculty_subjects_map))
+            return None
+        
+        logger.info("Found %d labs and %d faculties", len(labs), len(faculties))
+        logger.info("Faculty-Subject mapping has %d entries", len(faculty_subjects_map))
+        
+        # Phase 3: Prepare batch assignments
+        batch_assignments = self._prepare_batch_assignments(practicals)
+        logger.info("Created %d batch assignments", len(batch_assignments))
+        
+        if not batch_assignments:
+            logger.warning("No batch assignments created")
+            return None
+        
+        return batch_assignments, labs, faculties, faculty_subjects_map
+    
+    def _analyse_feasibility(self, batch_assignments, labs, faculties, faculty_subjects_map):
+        """Check capacity bounds before searching"""
+        report = feasibility.analyse(
+            batch_assignments,
+            labs,
+            faculties,
+            lambda name, assignment: self._is_faculty_qualified(name, assignment, faculty_subjects_map),
+            self.days,
+            self.slots,
+            self.lab_blocked,
+            self.faculty_blocked
+        )
+        logger.info("Feasibility pre-check: %s", 'passed' if report['feasible'] else 'failed')
+        return report
+    
+    def _load_time_grid(self):
+        """Load the configured days/slots and compile availability calendars into lookup tables"""
+        try:
+            grid = self.snapshot.get('time_grid') or {}
+            days = grid.get('days') or DAYS
+            slots = grid.get('slots') or SLOTS
+            
+            lab_blocked = {}
+            faculty_blocked = {}
+            for calendar in self.snapshot.get('availability', []):
+                blocked = set()
+                for entry in calendar.get('unavailable', []):
+                    if entry.get('day') not in days:
+                        continue
+                    if entry.get('slot'):
+                        # Entries for slots outside the grid cannot block anything
+                        if entry['slot'] in slots:
+                            blocked.add((entry['day'], entry['slot']))
+                    else:
+                        blocked.update((entry['day'], slot) for slot in slots)
+                
+                if blocked:
+                    target = lab_blocked if calendar.get('resource_type') == 'lab' else faculty_blocked
+                    target[calendar.get('name')] = frozenset(blocked)
+            
+            self._set_time_grid(days, slots, lab_blocked, faculty_blocked)
+            logger.info("Time grid: %d days x %d slots, %d labs and %d faculties with blackouts",
+                        len(days), len(slots), len(lab_blocked), len(faculty_blocked))
+        except Exception as e:
+            logger.error("Error loading time grid, using defaults: %s", e)
+            self._set_time_grid(DAYS, SLOTS, {}, {})
+    
+    def _set_time_grid(self, days, slots, lab_blocked, faculty_blocked):
+        """Install the time grid and the precomputed (day, slot) blackout sets"""
+        self.days = list(days)
+        self.slots = list(slots)
+        self.lab_blocked = lab_blocked  # lab name -> frozenset of (day, slot)
+        self.faculty_blocked = faculty_blocked  # faculty name -> frozenset of (day, slot)
+        self._slot_index = {slot: index for index, slot in enumerate(self.slots)}
     
     def _load_practicals(self):
-        """Load practicals from database and filter non-lab practicals"""
+        """Load practicals from the snapshot and filter non-lab practicals"""
         try:
-            subjects_doc = subjects_collection.find_one({})
+            subjects_doc = self.snapshot.get('subjects')
             if not subjects_doc or 'year' not in subjects_doc:
                 logger.error("No subjects document found")
                 return []
@@ -95,28 +231,28 @@ class PracticalTimetableGenerator:
                 if s.get('hrs_per_week_practical', 0) >= MIN_PRACTICAL_HOURS
             ]
             
-            logger.info(f"Loaded {len(practicals)} practicals for {self.year}")
+            logger.info("Loaded %d practicals for %s", len(practicals), self.year)
             return practicals
         except Exception as e:
-            logger.error(f"Error loading practicals: {str(e)}")
+            logger.error("Error loading practicals: %s", e)
             return []
     
     def _get_available_labs(self):
         """Get all available labs"""
         try:
-            labs = list(labs_collection.find({}, {'_id': 0}))
+            labs = list(self.snapshot.get('labs', []))
             return labs
         except Exception as e:
-            logger.error(f"Error loading labs: {str(e)}")
+            logger.error("Error loading labs: %s", e)
             return []
     
     def _get_all_faculties(self):
         """Get all faculties"""
         try:
-            faculties = list(faculty_collection.find({}, {'_id': 1, 'name': 1}))
+            faculties = list(self.snapshot.get('faculty', []))
             return faculties
         except Exception as e:
-            logger.error(f"Error loading faculties: {str(e)}")
+            logger.error("Error loading faculties: %s", e)
             return []
     
     def _get_faculty_subjects_mapping(self, practicals):
@@ -125,10 +261,10 @@ class PracticalTimetableGenerator:
             faculty_subjects = {}
             
             # Get all workloads
-            workloads = list(workload_collection.find({}))
+            workloads = self.snapshot.get('workload', [])
             
             # Get all faculties with their IDs
-            faculties = list(faculty_collection.find({}, {'_id': 1, 'name': 1}))
+            faculties = self.snapshot.get('faculty', [])
             faculty_id_to_name = {str(f['_id']): f['name'] for f in faculties}
             
             # Build mapping from workload
@@ -146,17 +282,19 @@ class PracticalTimetableGenerator:
                 if practical_subjects:
                     faculty_subjects[faculty_name] = practical_subjects
             
-            logger.info(f"Faculty-Subject mapping: {faculty_subjects}")
+            # The full map can be large; only log it when debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Faculty-Subject mapping: %s", faculty_subjects)
             return faculty_subjects
             
         except Exception as e:
-            logger.error(f"Error building faculty-subject mapping: {str(e)}")
+            logger.error("Error building faculty-subject mapping: %s", e)
             return {}
     
     def _get_classes_for_year(self):
         """Get class structure for this year"""
         try:
-            class_struct = class_structure_collection.find_one({})
+            class_struct = self.snapshot.get('class_structure')
             if not class_struct:
                 logger.error("No class structure found")
                 return []
@@ -166,11 +304,15 @@ class PracticalTimetableGenerator:
             
             return year_classes
         except Exception as e:
-            logger.error(f"Error loading class structure: {str(e)}")
+            logger.error("Error loading class structure: %s", e)
             return []
     
     def _prepare_batch_assignments(self, practicals):
-        """Split practicals into batches (1 hour each)"""
+        """
+        Split practicals into per-batch sessions. A session is a block of
+        contiguous slots in one lab with one faculty; practicals longer than
+        a day's slots are split into several evenly sized blocks.
+        """
         batch_assignments = []
         year_classes = self._get_classes_for_year()
         
@@ -180,21 +322,35 @@ class PracticalTimetableGenerator:
         
         for practical in practicals:
             total_hrs = practical.get('hrs_per_week_practical', 0)
-            num_batches = int(total_hrs)  # Each batch is 1 hour
+            total_periods = math.ceil(total_hrs / HOURS_PER_SLOT)
+            if total_hrs % HOURS_PER_SLOT:
+                # Saves reject such hours; data stored before that check is rounded up
+                logger.warning("%s has %s practical hours, scheduling %d hours (whole %d-hour slots)",
+                               practical.get('name'), total_hrs, total_periods * HOURS_PER_SLOT, HOURS_PER_SLOT)
+            num_blocks = math.ceil(total_periods / len(self.slots))
+            block_sizes = [
+                total_periods // num_blocks + (1 if i < total_periods % num_blocks else 0)
+                for i in range(num_blocks)
+            ]
             
             for class_info in year_classes:
                 div = class_info['div']
                 num_div_batches = class_info.get('batches', 1)
                 
                 for batch_num in range(1, num_div_batches + 1):
-                    batch_assignments.append({
-                        'subject': practical['short_name'],
-                        'subject_full': practical['name'],
-                        'class': self.year,
-                        'division': div,
-                        'batch': batch_num,
-                        'hours': 1
-                    })
+                    for periods in block_sizes:
+                        batch_assignments.append({
+                            'subject': practical['short_name'],
+                            'subject_full': practical['name'],
+                            'class': self.year,
+                            'division': div,
+                            'batch': batch_num,
+                            'hours': periods * HOURS_PER_SLOT,
+                            'periods': periods
+                        })
+        
+        # Place the longest blocks first, they have the fewest start positions
+        batch_assignments.sort(key=lambda a: -a['periods'])
         
         return batch_assignments
     
@@ -211,11 +367,180 @@ class PracticalTimetableGenerator:
             lab_name = lab.get('name', 'Unknown Lab')
             self.timetable['labs'][lab_name] = {}
             
-            for day in DAYS:
+            for day in self.days:
                 self.timetable['labs'][lab_name][day] = {
-                    slot: [] for slot in SLOTS
+                    slot: [] for slot in self.slots
                 }
     
+    def _solve(self, batch_assignments, labs, faculties, faculty_subjects_map):
+        """Solve independent components separately, falling back to one global search"""
+        components = self._decompose(batch_assignments, faculties, faculty_subjects_map)
+        
+        if len(components) > 1:
+            logger.info("Split %d batch assignments into %d independent components", len(batch_assignments), len(components))
+            lab_groups = self._partition_labs(components, labs)
+            
+            if lab_groups:
+                solved = self._solve_components(components, lab_groups, labs, faculties, faculty_subjects_map)
+                if solved:
+                    return True
+                if solved is None:
+                    return False
+            
+            logger.info("Component solve did not combine, falling back to a single search")
+            self._initialize_timetable(labs)
+            self.assignments = []
+        
+        return self._backtrack_assign(batch_assignments, labs, faculties, faculty_subjects_map, 0)
+    
+    def _solve_cp(self, batch_assignments, labs, faculties, faculty_subjects_map):
+        """Solve the whole instance with the CP-SAT model and copy the result into self.timetable"""
+        eligible = self._eligible_faculty(batch_assignments, faculties, faculty_subjects_map)
+        
+        placements, self.solver_stats = cp_solver.solve(
+            batch_assignments, labs, eligible, self.days, self.slots,
+            time_limit=self.time_limit, num_workers=self.num_workers,
+            lab_blocked=self.lab_blocked, faculty_blocked=self.faculty_blocked,
+            trace=self.trace
+        )
+        logger.info("CP-SAT finished with status %s in %ss", self.solver_stats['status'], self.solver_stats['wall_time_seconds'])
+        
+        if placements is None:
+            return False
+        
+        for assignment, day, slot, lab, faculty_name in placements:
+            self._make_assignment(assignment, day, slot, lab, faculty_name)
+        
+        return True
+    
+    def _decompose(self, batch_assignments, faculties, faculty_subjects_map):
+        """
+        Build the conflict graph of batch assignments and return its connected
+        components. Two assignments conflict when they share a batch or have an
+        eligible faculty in common; labs are shared by everyone and are split
+        between components separately. Eligibility is per (subject, division),
+        so divisions taught by different faculty become separate components.
+        """
+        parent = list(range(len(batch_assignments)))
+        
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        eligible = self._eligible_faculty(batch_assignments, faculties, faculty_subjects_map)
+        owner = {}
+        for index, assignment in enumerate(batch_assignments):
+            keys = [('batch', assignment['class'], assignment['division'], assignment['batch'])]
+            keys += [('faculty', name) for name in eligible[eligibility_key(assignment)]]
+            
+            for key in keys:
+                if key in owner:
+                    root_a, root_b = find(index), find(owner[key])
+                    if root_a != root_b:
+                        parent[root_a] = root_b
+                else:
+                    owner[key] = index
+        
+        groups = {}
+        for index, assignment in enumerate(batch_assignments):
+            groups.setdefault(find(index), []).append(assignment)
+        
+        return list(groups.values())
+    
+    def _lab_capacity(self, lab, periods):
+        """Periods of a lab that blocks of this length can occupy around its blackouts"""
+        blocked = self.lab_blocked.get(lab.get('name', 'Unknown Lab'), frozenset())
+        usable = set()
+        for day in self.days:
+            for start in self.slots[:len(self.slots) - periods + 1]:
+                block = self._block_slots({'periods': periods}, start)
+                if not any((day, slot) in blocked for slot in block):
+                    usable.update((day, slot) for slot in block)
+        return len(usable)
+    
+    def _partition_labs(self, components, labs):
+        """
+        Give each component a disjoint share of the labs it can use, enough
+        to cover its demand in periods. A lab's capacity for a component only
+        counts the periods its blocks fit in around the lab's blackouts, so a
+        fully blocked lab goes to nobody. Returns None when the labs cannot
+        cover every component.
+        """
+        demand = [sum(a.get('periods', 1) for a in component) for component in components]
+        capacity = [
+            [self._lab_capacity(lab, min(a.get('periods', 1) for a in component)) for lab in labs]
+            for component in components
+        ]
+        groups = [[] for _ in components]
+        covered = [0] * len(components)
+        free = set(range(len(labs)))
+        
+        # Most constrained component first: least usable capacity per period of demand
+        for i in sorted(range(len(components)), key=lambda i: sum(capacity[i]) / demand[i]):
+            for lab_index in sorted(free, key=lambda j: -capacity[i][j]):
+                if covered[i] >= demand[i] or not capacity[i][lab_index]:
+                    break
+                groups[i].append(lab_index)
+                covered[i] += capacity[i][lab_index]
+                free.discard(lab_index)
+            
+            if covered[i] < demand[i]:
+                return None
+        
+        for lab_index in sorted(free):
+            # Hand spare labs to the component with the highest load per usable period
+            users = [i for i in range(len(components)) if capacity[i][lab_index]]
+            if users:
+                busiest = max(users, key=lambda i: demand[i] / covered[i])
+                groups[busiest].append(lab_index)
+                covered[busiest] += capacity[busiest][lab_index]
+        
+        return [[labs[j] for j in sorted(group)] for group in groups]
+    
+    def _solve_components(self, components, lab_groups, labs, faculties, faculty_subjects_map):
+        """
+        Solve components (in parallel when possible) and merge them into self.timetable.
+        Returns True on success, False when the lab split was too tight and None
+        when a component is infeasible even with every lab.
+        """
+        time_grid = (self.days, self.slots, self.lab_blocked, self.faculty_blocked)
+        log_context = logging_setup.current()
+        jobs = [
+            (self.year, self.semester, component, lab_group, faculties, faculty_subjects_map, time_grid, log_context)
+            for component, lab_group in zip(components, lab_groups)
+        ]
+        
+        results = None
+        if min(GENERATOR_WORKERS, len(jobs)) > 1:
+            pool = _get_component_pool()
+            try:
+                results = list(pool.map(_solve_component, *zip(*jobs)))
+            except Exception as e:
+                logger.warning("Parallel component solve unavailable, solving sequentially: %s", e)
+                _discard_component_pool(pool)
+        
+        if results is None:
+            results = [_solve_component(*job) for job in jobs]
+        
+        for index, result in enumerate(results):
+            if result is None:
+                # Retry with every lab: if it still fails the whole instance is infeasible
+                component = jobs[index][2]
+                if _solve_component(self.year, self.semester, component, labs, faculties,
+                                    faculty_subjects_map, time_grid, log_context) is None:
+                    logger.error("Component %d of %d has no valid assignment", index + 1, len(jobs))
+                    return None
+                return False
+        
+        for lab_schedule, assignments in results:
+            for lab_name, days in lab_schedule.items():
+                self.timetable['labs'][lab_name] = days
+            self.assignments.extend(assignments)
+        
+        return True
+    
     def _backtrack_assign(self, batch_assignments, labs, faculties, faculty_subjects_map, index):
         """Backtracking algorithm to assign batches to slots"""
         
@@ -225,16 +550,16 @@ class PracticalTimetableGenerator:
         
         assignment = batch_assignments[index]
         
-        # Try all possible combinations
-        for day in DAYS:
-            for slot in SLOTS:
+        # Try all possible combinations (slot is the first slot of the block)
+        for day in self.days:
+            for slot in self._block_starts(assignment):
                 for lab in labs:
                     # Only try faculties who teach this subject for this year
                     for faculty in faculties:
                         faculty_name = faculty.get('name', '')
                         
                         # Check if faculty is qualified for this subject
-                        if not self._is_faculty_qualified(faculty_name, assignment['subject_full'], faculty_subjects_map):
+                        if not self._is_faculty_qualified(faculty_name, assignment, faculty_subjects_map):
                             continue
                         
                         # Check if this assignment is valid
@@ -245,6 +570,8 @@ class PracticalTimetableGenerator:
                             self._make_assignment(
                                 assignment, day, slot, lab, faculty_name
                             )
+                            if self.trace:
+                                self._trace_decision('place', assignment, day, slot, lab, faculty_name, index)
                             
                             # Recursively try next assignment
                             if self._backtrack_assign(
@@ -254,23 +581,67 @@ class PracticalTimetableGenerator:
                             
                             # Backtrack if failed
                             self._undo_assignment(assignment, day, slot, lab)
+                            if self.trace:
+                                self._trace_decision('undo', assignment, day, slot, lab, faculty_name, index)
         
         return False
     
-    def _is_valid_assignment(self, assignment, day, slot, lab, faculty_name):
-        """Check if assignment is valid (no conflicts)"""
+    def _trace_decision(self, event, assignment, day, slot, lab, faculty_name, depth):
+        """Log every TRACE_EVERY-th search decision; only called while tracing"""
+        self._trace_count += 1
+        if self._trace_count % logging_setup.TRACE_EVERY:
+            return
         
-        # C1: No batch conflict - same batch can't have 2 practicals in same slot
-        if self._has_batch_conflict(assignment, day, slot):
-            return False
-        
-        # C2: No lab conflict - lab can't have 2 practicals in same slot
-        if self._has_lab_conflict(lab, day, slot):
-            return False
+        tracer.debug(
+            "%s %s-%s-%s %s on %s %s in %s by %s",
+            event, assignment['class'], assignment['division'], assignment['batch'],
+            assignment['subject'], day, slot, lab.get('name', ''), faculty_name,
+            extra={
+                'event': event,
+                'decision': self._trace_count,
+                'depth': depth,
+                'year': self.year,
+                'batch': f"{assignment['class']}-{assignment['division']}-{assignment['batch']}",
+                'subject': assignment['subject'],
+                'day': day,
+                'slot': slot,
+                'lab': lab.get('name', ''),
+                'faculty': faculty_name
+            }
+        )
+    
+    def _block_starts(self, assignment):
+        """Slots where a block of this length can start without running past the day"""
+        return self.slots[:len(self.slots) - assignment.get('periods', 1) + 1]
+    
+    def _block_slots(self, assignment, slot):
+        """Contiguous slots covered by a block starting at slot"""
+        start = self._slot_index[slot]
+        return self.slots[start:start + assignment.get('periods', 1)]
+    
+    def _is_valid_assignment(self, assignment, day, slot, lab, faculty_name):
+        """Check if assignment is valid (no conflicts) in every slot of its block"""
+        lab_blocked = self.lab_blocked.get(lab.get('name', 'Unknown Lab'))
+        faculty_blocked = self.faculty_blocked.get(faculty_name)
         
-        # C3: No faculty conflict - faculty can't teach 2 batches in same slot
-        if self._has_faculty_conflict(faculty_name, day, slot):
-            return False
+        for block_slot in self._block_slots(assignment, slot):
+            # C0: Lab and faculty must be available (precomputed blackout sets)
+            if lab_blocked and (day, block_slot) in lab_blocked:
+                return False
+            if faculty_blocked and (day, block_slot) in faculty_blocked:
+                return False
+            
+            # C1: No batch conflict - same batch can't have 2 practicals in same slot
+            if self._has_batch_conflict(assignment, day, block_slot):
+                return False
+            
+            # C2: No lab conflict - lab can't have 2 practicals in same slot
+            if self._has_lab_conflict(lab, day, block_slot):
+                return False
+            
+            # C3: No faculty conflict - faculty can't teach 2 batches in same slot
+            if self._has_faculty_conflict(faculty_name, day, block_slot):
+                return False
         
         return True
     
@@ -311,36 +682,64 @@ class PracticalTimetableGenerator:
         
         return False
     
-    def _is_faculty_qualified(self, faculty_name, subject_full, faculty_subjects_map):
-        """Check if faculty is assigned to teach this subject"""
+    def _is_faculty_qualified(self, faculty_name, assignment, faculty_subjects_map):
+        """
+        Check if faculty is assigned to teach this batch assignment.
+        A workload entry (year, class, practical_hrs, lec_hrs) with practical
+        hours qualifies the faculty for the division in 'class'; an entry
+        without 'class' covers every division of the year. An optional 'subject' (full or short name)
+        narrows the entry to that subject.
+        """
         if faculty_name not in faculty_subjects_map:
             return False
         
-        # Check if this subject is in their workload
         faculty_workload = faculty_subjects_map[faculty_name]
         for workload_entry in faculty_workload:
-            # The workload entry has year, class, practical_hrs, lec_hrs
-            # We just check if the faculty has any workload for this year
-            if workload_entry.get('year') == self.year:
-                return True
+            if workload_entry.get('year') != self.year:
+                continue
+            if not _has_practical_hours(workload_entry):
+                continue  # lecture-only entries do not staff practicals
+            if workload_entry.get('class') and workload_entry['class'] != assignment['division']:
+                continue
+            if workload_entry.get('subject') and workload_entry['subject'] not in (
+                assignment['subject_full'], assignment['subject']
+            ):
+                continue
+            return True
         
         return False
     
+    def _eligible_faculty(self, batch_assignments, faculties, faculty_subjects_map):
+        """Qualified faculty names per eligibility_key() of the batch assignments"""
+        eligible = {}
+        for assignment in batch_assignments:
+            key = eligibility_key(assignment)
+            if key not in eligible:
+                eligible[key] = [
+                    f.get('name', '') for f in faculties
+                    if self._is_faculty_qualified(f.get('name', ''), assignment, faculty_subjects_map)
+                ]
+        return eligible
+    
     def _make_assignment(self, assignment, day, slot, lab, faculty_name):
-        """Add assignment to timetable"""
+        """Add assignment to timetable, filling every slot of its block"""
         lab_name = lab.get('name', 'Unknown Lab')
+        block_slots = self._block_slots(assignment, slot)
         
-        slot_entry = {
-            'class': assignment['class'],
-            'division': assignment['division'],
-            'batch': assignment['batch'],
-            'subject': assignment['subject'],
-            'subject_full': assignment['subject_full'],
-            'faculty': faculty_name
-        }
-        
-        if lab_name in self.timetable['labs']:
-            self.timetable['labs'][lab_name][day][slot].append(slot_entry)
+        for part, block_slot in enumerate(block_slots, start=1):
+            slot_entry = {
+                'class': assignment['class'],
+                'division': assignment['division'],
+                'batch': assignment['batch'],
+                'subject': assignment['subject'],
+                'subject_full': assignment['subject_full'],
+                'faculty': faculty_name,
+                'periods': len(block_slots),
+                'part': part
+            }
+            
+            if lab_name in self.timetable['labs']:
+                self.timetable['labs'][lab_name][day][block_slot].append(slot_entry)
         
         self.assignments.append({
             'assignment': assignment,
@@ -357,17 +756,18 @@ class PracticalTimetableGenerator:
         
         lab_name = lab.get('name', 'Unknown Lab')
         if lab_name in self.timetable['labs']:
-            slot_list = self.timetable['labs'][lab_name][day][slot]
-            if slot_list:
-                slot_list.pop()
+            for block_slot in self._block_slots(assignment, slot):
+                slot_list = self.timetable['labs'][lab_name][day][block_slot]
+                if slot_list:
+                    slot_list.pop()
     
     def _validate_final_timetable(self):
         """Validate final timetable meets all constraints"""
         
         # Check all hard constraints are satisfied
         for lab_name, lab_schedule in self.timetable['labs'].items():
-            for day in DAYS:
-                for slot in SLOTS:
+            for day in self.days:
+                for slot in self.slots:
                     slot_assignments = lab_schedule[day][slot]
                     
                     # Ensure no duplicates or conflicts
@@ -380,27 +780,28 @@ class PracticalTimetableGenerator:
         """Save generated timetable to database"""
         try:
             # Prepare document
-            doc = {
+            doc = tenancy.stamp({
                 'year': self.year,
                 'semester': self.semester,
                 'generated_at': datetime.now(),
                 'schedule': self.timetable,
-                'total_assignments': len(self.assignments)
-            }
+                'total_assignments': len(self.assignments),
+                'config_versions': self.snapshot.get('config_versions')
+            }, self.department)
             
-            # Delete existing timetable for this year/semester
-            master_lab_timetable_collection.delete_many({
-                'year': self.year,
-                'semester': self.semester
-            })
-            
-            # Insert new timetable
-            result = master_lab_timetable_collection.insert_one(doc)
-            logger.info(f"Timetable saved with ID: {result.inserted_id}")
-            return result.inserted_id
+            # Replace the department's timetable for this year/semester
+            saved = master_lab_timetable_collection.find_one_and_replace(
+                tenancy.scoped({'year': self.year, 'semester': self.semester}, self.department),
+                doc,
+                projection={'_id': 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            logger.info("Timetable saved with ID: %s", saved['_id'])
+            return saved['_id']
             
         except Exception as e:
-            logger.error(f"Error saving timetable to database: {str(e)}")
+            logger.error("Error saving timetable to database: %s", e)
             return None
 
 
@@ -409,12 +810,24 @@ def generate(data):
     year = data.get('year')
     semester = data.get('sem')
     
+    backend = data.get('backend', 'backtracking')
+    
     if not year or not semester:
         logger.error("Missing year or semester")
         return None
     
+    if backend not in BACKENDS:
+        logger.error("Unknown backend '%s'", backend)
+        return None
+    
     # Generate timetable
-    generator = PracticalTimetableGenerator(year, semester)
+    generator = PracticalTimetableGenerator(
+        year, semester,
+        backend=backend,
+        time_limit=data.get('time_limit'),
+        num_workers=data.get('num_workers'),
+        department=data.get('department', tenancy.DEFAULT_DEPARTMENT)
+    )
     timetable = generator.generate()
     
     if timetable:
@@ -422,4 +835,137 @@ def generate(data):
         generator.save_to_database()
         return timetable
     
-    return None
\ No newline at end of file
+    return None
+
+
+def _config_versions(subjects, class_structure, workloads):
+    """Versions of the versioned configuration documents (see modules/versioning.py)"""
+    return {
+        'subjects': versioning.version_of(subjects),
+        'class_structure': versioning.version_of(class_structure),
+        'workload': {str(w.get('faculty_id')): versioning.version_of(w) for w in workloads}
+    }
+
+
+def _current_config_versions(scope):
+    version_only = {'_id': 0, 'version': 1}
+    return _config_versions(
+        subjects_collection.find_one(scope, version_only),
+        class_structure_collection.find_one(scope, version_only),
+        workload_collection.find(scope, {'_id': 0, 'faculty_id': 1, 'version': 1})
+    )
+
+
+def load_snapshot(department=tenancy.DEFAULT_DEPARTMENT):
+    """
+    Read every generator input of one department. The generator only works
+    from this dict, so one run sees a single configuration version throughout;
+    callers can also pass a modified copy (see modules/simulation.py).
+    The read is repeated if subjects, class structure or workload are saved
+    while it runs; the pinned versions are kept under 'config_versions'.
+    Raises RuntimeError if the configuration never holds still.
+    """
+    scope = tenancy.scoped(department=department)
+    
+    for attempt in range(1, SNAPSHOT_ATTEMPTS + 1):
+        snapshot = {
+            'subjects': subjects_collection.find_one(scope),
+            'class_structure': class_structure_collection.find_one(scope),
+            'faculty': list(faculty_collection.find(scope, {'_id': 1, 'name': 1})),
+            'labs': list(labs_collection.find(scope, {'_id': 0})),
+            'workload': list(workload_collection.find(scope)),
+            'time_grid': time_grid_collection.find_one(scope, {'_id': 0}),
+            'availability': list(availability_collection.find(scope, {'_id': 0}))
+        }
+        versions = _config_versions(snapshot['subjects'], snapshot['class_structure'], snapshot['workload'])
+        
+        if versions == _current_config_versions(scope):
+            break
+        logger.info("Configuration of %s changed while loading (attempt %d), reading again", department, attempt)
+    else:
+        raise RuntimeError(f"Configuration of {department} kept changing while loading; try again")
+    
+    snapshot['config_versions'] = versions
+    return snapshot
+
+
+def eligibility_key(assignment):
+    """Batch assignments with the same key have the same qualified faculty"""
+    return assignment['subject_full'], assignment['division']
+
+
+def practical_hours_error(hours, field):
+    """
+    Error message when practical hours that go to labs do not fill whole
+    lab slots (a multiple of HOURS_PER_SLOT), else None
+    """
+    if isinstance(hours, bool) or not isinstance(hours, (int, float)):
+        return f"'{field}' must be a number"
+    if hours >= MIN_PRACTICAL_HOURS and hours % HOURS_PER_SLOT:
+        return f"'{field}' must be a multiple of {HOURS_PER_SLOT} (one lab slot), got {hours}"
+    return None
+
+
+def _has_practical_hours(workload_entry):
+    try:
+        return float(workload_entry.get('practical_hrs') or 0) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+def _get_component_pool():
+    """
+    Component processes are started once per process (GENERATOR_WORKERS of
+    them, within the job's share of the host budget) and reused by every
+    generation
+    """
+    global _component_pool, _component_pool_pid
+    
+    pid = os.getpid()
+    with _component_pool_lock:
+        if _component_pool is None or _component_pool_pid != pid:
+            _component_pool = job_runner.process_pool(GENERATOR_WORKERS)
+            _component_pool_pid = pid
+    
+    return _component_pool
+
+
+def _discard_component_pool(pool):
+    """Drop a pool that failed so the next generation starts a fresh one"""
+    global _component_pool
+    with _component_pool_lock:
+        if _component_pool is pool:
+            _component_pool = None
+    pool.shutdown(wait=False)
+
+
+def _solve_component(year, semester, batch_assignments, labs, faculties, faculty_subjects_map, time_grid,
+                     log_context=None):
+    """Solve one independent component on its own labs; returns (labs schedule, assignments) or None"""
+    tokens = logging_setup.bind(**(log_context or {}))
+    try:
+        generator = PracticalTimetableGenerator(year, semester)
+        generator._set_time_grid(*time_grid)
+        generator._initialize_timetable(labs)
+        
+        if not generator._backtrack_assign(batch_assignments, labs, faculties, faculty_subjects_map, 0):
+            return None
+        
+        return generator.timetable['labs'], generator.assignments
+    finally:
+        logging_setup.reset(tokens)
+
+
+def check_feasibility(data):
+    """Entry point for the pre-solve feasibility analysis"""
+    year = data.get('year')
+    semester = data.get('sem')
+    
+    if not year or not semester:
+        logger.error("Missing year or semester")
+        return None
+    
+    generator = PracticalTimetableGenerator(
+        year, semester, department=data.get('department', tenancy.DEFAULT_DEPARTMENT)
+    )
+    return generator.check_feasibility()
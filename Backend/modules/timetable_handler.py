@@ -1,10 +1,33 @@
 from flask import jsonify
+from pymongo import ReturnDocument
 from config import db
-from modules import timetable_generator
+from modules import timetable_generator, job_runner, timetable_metrics, simulation, tenancy, cp_solver
 
 timetable_collection = db['timetable']
 master_lab_timetable_collection = db['master_lab_timetable']
 
+def _is_positive(value, types):
+    return isinstance(value, types) and not isinstance(value, bool) and value > 0
+
+
+def _solver_options_error(data):
+    """Validate backend, time_limit and num_workers; returns an error message or None"""
+    backend = data.get("backend", "backtracking")
+    if backend not in timetable_generator.BACKENDS:
+        return f"Unknown backend '{backend}'"
+
+    if backend == "cpsat" and not cp_solver.is_available():
+        return "The 'cpsat' backend is not available: the 'ortools' package is not installed"
+
+    if data.get("time_limit") is not None and not _is_positive(data["time_limit"], (int, float)):
+        return "time_limit must be a positive number of seconds"
+
+    if data.get("num_workers") is not None and not _is_positive(data["num_workers"], int):
+        return "num_workers must be a positive integer"
+
+    return None
+
+
 # ---------- Generate timetable for single year ----------
 def generate_timetable(data):
     """
@@ -12,7 +35,10 @@ def generate_timetable(data):
     Expected data:
     {
         "year": "SY",
-        "sem": "1"
+        "sem": "1",
+        "backend": "backtracking" | "cpsat",   (optional)
+        "time_limit": 60,                     (optional, cpsat only)
+        "num_workers": 8                      (optional, cpsat only)
     }
     """
     year = data.get("year")
@@ -21,25 +47,67 @@ def generate_timetable(data):
     if not year or not sem:
         return jsonify({"error": "Missing year or semester"}), 400
 
-    try:
-        # Call the timetable generator module
-        generated_tt = timetable_generator.generate(data)
+    error = _solver_options_error(data)
+    if error:
+        return jsonify({"error": error}), 400
 
-        if not generated_tt:
+    try:
+        # Search runs in the job pool, off the request worker
+        data = {**data, "department": tenancy.current_department()}
+        if not job_runner.run(_generate_single, data):
             return jsonify({"error": "Failed to generate timetable"}), 500
 
-        # Delete existing timetable for this year/sem
-        timetable_collection.delete_many({"year": year, "sem": sem})
+        return jsonify({"message": f"Timetable generated and saved for {year} sem {sem}"})
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _generate_single(data):
+    """Job: generate and save one year's timetable; returns True on success"""
+    year = data.get("year")
+    sem = data.get("sem")
+    department = data["department"]
+
+    # Call the timetable generator module
+    generated_tt = timetable_generator.generate(data)
+
+    if not generated_tt:
+        return False
 
-        # Save the generated timetable
-        timetable_collection.insert_one({
+    # Replace the department's timetable for this year/sem
+    timetable_collection.replace_one(
+        tenancy.scoped({"year": year, "sem": sem}, department),
+        tenancy.stamp({
             "year": year,
             "sem": sem,
             "timetable": generated_tt
-        })
+        }, department),
+        upsert=True
+    )
 
-        return jsonify({"message": f"Timetable generated and saved for {year} sem {sem}"})
+    return True
+
+
+# ---------- Feasibility pre-check ----------
+def check_feasibility(data):
+    """
+    Analyse capacity for a year/semester without running the search
+    Expected data:
+    {
+        "year": "SY",
+        "sem": "1"
+    }
+    """
+    year = data.get("year")
+    sem = data.get("sem")
 
+    if not year or not sem:
+        return jsonify({"error": "Missing year or semester"}), 400
+
+    try:
+        report = timetable_generator.check_feasibility({**data, "department": tenancy.current_department()})
+        return jsonify(report)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -50,7 +118,11 @@ def generate_all_timetables(data):
     Generate timetables for all years (SY, TY, BE) for a specific semester
     Expected data:
     {
-        "sem": "1"
+        "sem": "1",
+        "backend": "backtracking" | "cpsat",   (optional)
+        "time_limit": 60,                     (optional, cpsat only)
+        "num_workers": 8,                     (optional, cpsat only)
+        "async": true                         (optional, return a job id at once)
     }
     """
     sem = data.get("sem")
@@ -58,59 +130,179 @@ def generate_all_timetables(data):
     if not sem:
         return jsonify({"error": "Missing semester"}), 400
 
+    error = _solver_options_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
     try:
-        years = ["SY", "TY", "BE"]
-        results = {
-            "semester": sem,
-            "generated_timetables": []
-        }
+        # Search runs in the job pool, off the request worker
+        data = {**data, "department": tenancy.current_department()}
+        if data.get("async"):
+            job_id, _ = job_runner.submit(_generate_all, data)
+            return jsonify({
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/api/jobs/{job_id}"
+            }), 202
 
-        for year in years:
-            # Generate timetable for this year
-            generated_tt = timetable_generator.generate({
-                "year": year,
-                "sem": sem
-            })
+        return jsonify(job_runner.run(_generate_all, data))
 
-            if generated_tt:
-                # Delete existing timetable for this year/sem
-                master_lab_timetable_collection.delete_many({
-                    "year": year,
-                    "semester": sem
-                })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def _generate_all(data):
+    """Job: generate and save timetables for SY, TY and BE; returns the summary"""
+    sem = data.get("sem")
+    department = data["department"]
+    years = ["SY", "TY", "BE"]
+    results = {
+        "semester": sem,
+        "generated_timetables": []
+    }
 
-                # Save the generated timetable
-                result = master_lab_timetable_collection.insert_one({
+    for year in years:
+        # Generate timetable for this year
+        generated_tt = timetable_generator.generate({
+            "year": year,
+            "sem": sem,
+            "backend": data.get("backend", "backtracking"),
+            "time_limit": data.get("time_limit"),
+            "num_workers": data.get("num_workers"),
+            "department": department
+        })
+
+        if generated_tt:
+            # Replace the department's timetable for this year/sem
+            saved = master_lab_timetable_collection.find_one_and_replace(
+                tenancy.scoped({"year": year, "semester": sem}, department),
+                tenancy.stamp({
                     "year": year,
                     "semester": sem,
                     "schedule": generated_tt
-                })
+                }, department),
+                projection={"_id": 1},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
 
-                results["generated_timetables"].append({
-                    "year": year,
-                    "status": "success",
-                    "id": str(result.inserted_id)
-                })
-            else:
-                results["generated_timetables"].append({
-                    "year": year,
-                    "status": "failed",
-                    "reason": "No practicals found or constraint satisfaction failed"
-                })
+            results["generated_timetables"].append({
+                "year": year,
+                "status": "success",
+                "id": str(saved["_id"])
+            })
+        else:
+            results["generated_timetables"].append({
+                "year": year,
+                "status": "failed",
+                "reason": "No practicals found or constraint satisfaction failed"
+            })
 
-        return jsonify(results)
+    if not any(item["status"] == "success" for item in results["generated_timetables"]):
+        # Lets the job runner record the job as failed
+        results["status"] = "failed"
+        results["reason"] = "No timetable could be generated for any year"
+
+    return results
+
+
+# ---------- What-if simulation ----------
+def simulate(data):
+    """
+    Solve one or more what-if scenarios against the current data without saving
+    Expected data:
+    {
+        "sem": "1",
+        "years": ["SY"],                      (optional, default SY, TY, BE)
+        "backend": "backtracking" | "cpsat",  (optional)
+        "include_timetable": false,           (optional)
+        "scenarios": [
+            {"name": "extra lab", "overlay": {"labs": {"add": [{"name": "Lab 9", "short_name": "L9"}]}}},
+            {"name": "Dr. X on leave", "overlay": {"workload": [{"faculty_name": "Dr. X", "subjects": []}]}}
+        ]
+    }
+    A single "overlay" may be given instead of "scenarios". See modules/simulation.py
+    for the overlay format.
+    """
+    sem = data.get("sem")
+    backend = data.get("backend", "backtracking")
+    scenarios = data.get("scenarios")
+    if scenarios is None:
+        scenarios = [{"name": "scenario", "overlay": data.get("overlay")}]
+
+    if not sem:
+        return jsonify({"error": "Missing semester"}), 400
+
+    error = _solver_options_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+
+    if not isinstance(scenarios, list) or not scenarios:
+        return jsonify({"error": "Missing scenarios list"}), 400
+
+    years = data.get("years", simulation.YEARS)
+    error = simulation.years_error(years)
+    if error:
+        return jsonify({"error": error}), 400
+
+    try:
+        # One read of the department's current data, shared by every scenario
+        snapshot = timetable_generator.load_snapshot(tenancy.current_department())
+
+        params_list = []
+        for index, scenario in enumerate(scenarios):
+            if not isinstance(scenario, dict):
+                return jsonify({"error": f"Scenario {index} must be an object"}), 400
+            name = scenario.get("name") or f"scenario {index + 1}"
+            try:
+                scenario_snapshot = simulation.apply_overlay(snapshot, scenario.get("overlay"))
+            except ValueError as e:
+                return jsonify({"error": f"Scenario '{name}': {str(e)}"}), 400
+
+            params_list.append({
+                "name": name,
+                "snapshot": scenario_snapshot,
+                "sem": sem,
+                "years": years,
+                "backend": backend,
+                "time_limit": data.get("time_limit"),
+                "num_workers": data.get("num_workers"),
+                "include_timetable": bool(data.get("include_timetable"))
+            })
+
+        # Scenarios run side by side in the job pool; nothing is persisted
+        return jsonify({
+            "semester": sem,
+            "scenarios": job_runner.run_many(simulation.run_scenario, params_list)
+        })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+# ---------- Generation job status ----------
+def get_generation_job(job_id):
+    """
+    Retrieve the status (and result once finished) of a generation job
+    """
+    try:
+        job = job_runner.get_job(job_id, tenancy.current_department())
+        if not job:
+            return jsonify({"error": f"Job '{job_id}' not found"}), 404
+
+        job["job_id"] = job.pop("_id")
+        return jsonify(job)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
 # ---------- Get all generated timetables ----------
 def get_all_master_timetables():
     """
     Retrieve all generated master lab timetables
     """
     try:
-        timetables = list(master_lab_timetable_collection.find({}, {'_id': 0}))
+        timetables = list(master_lab_timetable_collection.find(tenancy.scoped(), {'_id': 0, 'department': 0}))
         return jsonify(timetables)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -133,14 +325,48 @@ def get_master_timetable(data):
         return jsonify({"error": "Missing year or semester"}), 400
 
     try:
-        timetable = master_lab_timetable_collection.find_one({
+        timetable = master_lab_timetable_collection.find_one(tenancy.scoped({
             "year": year,
             "semester": sem
-        }, {'_id': 0})
+        }), {'_id': 0, 'department': 0})
 
         if not timetable:
             return jsonify({"error": f"Timetable not found for {year} sem {sem}"}), 404
 
         return jsonify(timetable)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"error": str(e)}), 500
+
+
+# ---------- Quality metrics for a stored timetable ----------
+def get_timetable_metrics(data):
+    """
+    Score the master lab timetable for a specific year/semester
+    Expected data:
+    {
+        "year": "SY",
+        "sem": "1"
+    }
+    """
+    year = data.get("year")
+    sem = data.get("sem")
+
+    if not year or not sem:
+        return jsonify({"error": "Missing year or semester"}), 400
+
+    try:
+        timetable = master_lab_timetable_collection.find_one(tenancy.scoped({
+            "year": year,
+            "semester": sem
+        }), {'_id': 0, 'schedule.labs': 1})
+
+        if not timetable:
+            return jsonify({"error": f"Timetable not found for {year} sem {sem}"}), 404
+
+        return jsonify({
+            "year": year,
+            "semester": sem,
+            "metrics": timetable_metrics.score_schedule(timetable['schedule'])
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,219 @@
+"""
+Vectorised quality metrics for master lab timetables.
+
+A timetable is encoded as two integer arrays over labs x days x slots: the
+faculty index and the batch index in each cell (-1 when the lab is free).
+All metrics are computed with NumPy over a leading candidate axis, so
+thousands of candidate timetables can be scored in a single call:
+
+    faculty, batch, index = encode(schedule)
+    metrics = score(faculty, batch, len(index['faculty']), len(index['batches']))
+
+Requires NumPy.
+"""
+try:
+    import numpy as np
+except ImportError:  # NumPy is only needed for scoring
+    np = None
+
+LATE_SLOT = '16:20'
+
+# Penalty weights for the combined 'penalty' metric (lower is better)
+WEIGHTS = {
+    'idle_gaps': 1.0,
+    'faculty_load_cv': 2.0,
+    'batch_day_crowding': 1.0,
+    'late_slot_share': 1.0
+}
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("Timetable metrics require the 'numpy' package")
+
+
+def _grid(labs):
+    """Day and slot order as stored in the schedule"""
+    days, slots = [], []
+    for lab_schedule in labs.values():
+        for day, day_schedule in lab_schedule.items():
+            if day not in days:
+                days.append(day)
+            for slot in day_schedule:
+                if slot not in slots:
+                    slots.append(slot)
+    return days, slots
+
+
+def encode(schedule, faculty_names=None, batch_keys=None):
+    """
+    Encode schedule['labs'] as (faculty, batch, index).
+    faculty and batch are int32 arrays of shape (labs, days, slots); index
+    holds the label lists for every axis and id. Pass faculty_names /
+    batch_keys to encode several timetables against the same ids.
+    """
+    _require_numpy()
+
+    labs = schedule.get('labs', {})
+    lab_names = list(labs)
+    days, slots = _grid(labs)
+    faculty_ids = {name: i for i, name in enumerate(faculty_names or [])}
+    batch_ids = {key: i for i, key in enumerate(batch_keys or [])}
+
+    faculty = np.full((len(lab_names), len(days), len(slots)), -1, dtype=np.int32)
+    batch = np.full_like(faculty, -1)
+
+    for l, lab_name in enumerate(lab_names):
+        for d, day in enumerate(days):
+            day_schedule = labs[lab_name].get(day, {})
+            for s, slot in enumerate(slots):
+                entries = day_schedule.get(slot)
+                if not entries:
+                    continue
+                entry = entries[0]
+                key = f"{entry.get('class')}-{entry.get('division')}-{entry.get('batch')}"
+                faculty[l, d, s] = faculty_ids.setdefault(entry.get('faculty'), len(faculty_ids))
+                batch[l, d, s] = batch_ids.setdefault(key, len(batch_ids))
+
+    index = {
+        'labs': lab_names,
+        'days': days,
+        'slots': slots,
+        'faculty': list(faculty_ids),
+        'batches': list(batch_ids)
+    }
+    return faculty, batch, index
+
+
+def _one_hot_any(cells, count):
+    """(N, L, D, S) ids -> (N, count, D, S) bool: is id k present in any lab"""
+    ids = np.arange(count, dtype=cells.dtype).reshape(1, count, 1, 1, 1)
+    return (cells[:, None] == ids).any(axis=2)
+
+
+def _empty_scores(n):
+    """Scores of timetables without any lab period (no labs, days or slots)"""
+    zeros = np.zeros(n)
+    counts = np.zeros(n, dtype=np.int64)
+    return {
+        'sessions': counts,
+        'lab_utilisation': zeros,
+        'lab_utilisation_min': zeros,
+        'faculty_load_cv': zeros,
+        'idle_gaps': counts,
+        'batch_day_spread': np.ones(n),
+        'batch_day_crowding': zeros,
+        'late_slot_share': zeros,
+        'penalty': zeros
+    }
+
+
+def score(faculty, batch, n_faculty, n_batches, late_slot_index=None):
+    """
+    Score one (L, D, S) or many (N, L, D, S) encoded timetables.
+    Returns a dict of NumPy arrays with one value per candidate:
+      sessions               occupied lab periods
+      lab_utilisation        share of lab periods in use
+      lab_utilisation_min    utilisation of the least used lab
+      faculty_load_cv        coefficient of variation of periods per faculty
+      idle_gaps              free periods between a faculty's first and last session of a day
+      batch_day_spread       mean share of a batch's possible days that it uses
+      batch_day_crowding     mean of (max periods in one day - 1) per batch
+      late_slot_share        share of occupied periods in the late slot (0 when
+                             late_slot_index is None, i.e. the grid has no late slot)
+      penalty                weighted sum of the penalties above (lower is better)
+    """
+    _require_numpy()
+
+    faculty = np.asarray(faculty)
+    batch = np.asarray(batch)
+    if faculty.ndim == 3:
+        faculty, batch = faculty[None], batch[None]
+
+    n, _, n_days, n_slots = faculty.shape
+    if 0 in faculty.shape[1:]:
+        return _empty_scores(n)
+
+    occupied = faculty >= 0
+    sessions = occupied.sum(axis=(1, 2, 3))
+    safe_sessions = np.maximum(sessions, 1)
+
+    # Lab utilisation
+    per_lab = occupied.mean(axis=(2, 3))
+    lab_utilisation = occupied.mean(axis=(1, 2, 3))
+    lab_utilisation_min = per_lab.min(axis=1) if per_lab.shape[1] else np.zeros(n)
+
+    # Faculty load balance and idle gaps
+    if n_faculty:
+        teaching = _one_hot_any(faculty, n_faculty)                 # (N, F, D, S)
+        load = teaching.sum(axis=(2, 3)).astype(np.float64)         # (N, F)
+        mean_load = load.mean(axis=1)
+        faculty_load_cv = np.where(mean_load > 0, load.std(axis=1) / np.maximum(mean_load, 1e-9), 0.0)
+
+        slot_ids = np.arange(n_slots)
+        first = np.where(teaching, slot_ids, n_slots).min(axis=3)
+        last = np.where(teaching, slot_ids, -1).max(axis=3)
+        taught = teaching.sum(axis=3)
+        idle_gaps = np.where(taught > 0, last - first + 1 - taught, 0).sum(axis=(1, 2))
+    else:
+        faculty_load_cv = np.zeros(n)
+        idle_gaps = np.zeros(n, dtype=np.int64)
+
+    # Batch spread across days
+    if n_batches:
+        attending = _one_hot_any(batch, n_batches)                  # (N, B, D, S)
+        per_day = attending.sum(axis=3)                             # (N, B, D)
+        total = per_day.sum(axis=2)
+        days_used = (per_day > 0).sum(axis=2)
+        possible = np.minimum(total, n_days)
+        active = total > 0
+        n_active = np.maximum(active.sum(axis=1), 1)
+        spread = np.where(active, days_used / np.maximum(possible, 1), 0.0)
+        batch_day_spread = spread.sum(axis=1) / n_active
+        crowding = np.where(active, per_day.max(axis=2) - 1, 0)
+        batch_day_crowding = crowding.sum(axis=1) / n_active
+    else:
+        batch_day_spread = np.ones(n)
+        batch_day_crowding = np.zeros(n)
+
+    # Late slot usage
+    if late_slot_index is None:
+        late_slot_share = np.zeros(n)
+    else:
+        late_slot_share = occupied[..., late_slot_index].sum(axis=(1, 2)) / safe_sessions
+
+    penalty = (
+        WEIGHTS['idle_gaps'] * idle_gaps
+        + WEIGHTS['faculty_load_cv'] * faculty_load_cv
+        + WEIGHTS['batch_day_crowding'] * batch_day_crowding
+        + WEIGHTS['late_slot_share'] * late_slot_share
+    )
+
+    return {
+        'sessions': sessions,
+        'lab_utilisation': lab_utilisation,
+        'lab_utilisation_min': lab_utilisation_min,
+        'faculty_load_cv': faculty_load_cv,
+        'idle_gaps': idle_gaps,
+        'batch_day_spread': batch_day_spread,
+        'batch_day_crowding': batch_day_crowding,
+        'late_slot_share': late_slot_share,
+        'penalty': penalty
+    }
+
+
+def score_schedule(schedule):
+    """Score a single stored schedule and return plain Python numbers"""
+    faculty, batch, index = encode(schedule)
+    late_slot_index = index['slots'].index(LATE_SLOT) if LATE_SLOT in index['slots'] else None
+    metrics = score(faculty, batch, len(index['faculty']), len(index['batches']), late_slot_index)
+
+    result = {name: round(float(values[0]), 4) for name, values in metrics.items()}
+    result['sessions'] = int(metrics['sessions'][0])
+    result['idle_gaps'] = int(metrics['idle_gaps'][0])
+    per_lab = (faculty >= 0).mean(axis=(1, 2)) if faculty.size else np.zeros(len(index['labs']))
+    result['per_lab_utilisation'] = {
+        lab_name: round(float(value), 4)
+        for lab_name, value in zip(index['labs'], per_lab)
+    }
+    return result
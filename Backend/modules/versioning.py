@@ -0,0 +1,79 @@
+"""
+Optimistic concurrency for configuration documents.
+
+Subjects, class structure and workload documents carry an integer 'version'
+that every save increments. A client sends back the version it read in an
+If-Match header. The save is a compare-and-swap: it replaces the document in
+place only if the version still matches. Otherwise it fails with 412, so
+concurrent admins cannot silently overwrite each other. Saves without
+If-Match still replace in place, and the version still goes up.
+"""
+import re
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+
+ETAG_PATTERN = re.compile(r'^(?:W/)?"?(\d+)"?$')
+
+
+class VersionConflict(Exception):
+    def __init__(self, current_version):
+        super().__init__(f"Document was modified (current version {current_version}); reload and retry")
+        self.current_version = current_version
+
+
+def parse_if_match(value):
+    """
+    Version from an If-Match header: None when absent or '*', else an int.
+    Raises ValueError for anything else.
+    """
+    if value is None or value.strip() in ('', '*'):
+        return None
+    match = ETAG_PATTERN.match(value.strip())
+    if not match:
+        raise ValueError("If-Match must be a document version, e.g. \"3\"")
+    return int(match.group(1))
+
+
+def with_etag(response, version):
+    """Attach the document version to a response as its ETag"""
+    response.set_etag(str(version))
+    return response
+
+
+def version_of(doc):
+    """Stored version; documents written before versioning count as version 0"""
+    return (doc or {}).get('version', 0)
+
+
+def save(collection, query, doc, expected=None):
+    """
+    Replace the single document matching query with doc and bump its version.
+    expected is the version the caller read (0 = must not exist yet) or None
+    to save unconditionally. Returns the new version. Raises VersionConflict
+    only when expected is given; an unconditional save retries until it
+    lands (each lost race means another save succeeded).
+    """
+    while True:
+        current = collection.find_one(query, {'version': 1})
+        version = version_of(current)
+        if expected is not None and expected != version:
+            raise VersionConflict(version)
+
+        new_doc = {**doc, **query, 'version': version + 1, 'updated_at': datetime.now()}
+        if current is None:
+            try:
+                collection.insert_one(new_doc)
+                return version + 1
+            except DuplicateKeyError:
+                if collection.find_one(query, {'_id': 1}) is None:
+                    raise  # clashes with some other document, retrying cannot help
+                # created concurrently; compare again
+        else:
+            # Matches only if nobody saved since we read the version
+            result = collection.replace_one({'_id': current['_id'], 'version': current.get('version')}, new_doc)
+            if result.matched_count:
+                return version + 1
+
+        if expected is not None:
+            raise VersionConflict(version_of(collection.find_one(query, {'version': 1})))
+        # Unconditional save: another writer got in first, save on top of its version
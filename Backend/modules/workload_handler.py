@@ -1,13 +1,66 @@
 from flask import jsonify
 from bson import ObjectId
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
 from config import db
+from modules import tenancy, versioning
+from modules.timetable_generator import practical_hours_error
 
 workload_collection = db['workload']
 faculty_collection = db['faculty']
 
-def save_faculty_workload(data):
+
+def _subjects_error(subjects):
+    """Error message for a workload subjects list, or None when every entry is valid"""
+    if not isinstance(subjects, list):
+        return "subjects must be a list"
+    for entry in subjects:
+        if not isinstance(entry, dict):
+            return "Every subjects entry must be an object"
+        error = practical_hours_error(entry.get("practical_hrs", 0), "practical_hrs")
+        if error:
+            return error
+    return None
+
+def get_faculty_workload(faculty_name=None):
+    """
+    Return one faculty's workload with its version (also sent as the ETag),
+    or every workload of the department when no faculty_name is given.
+    """
+    try:
+        query = {"name": faculty_name} if faculty_name else {}
+        faculty_names = {
+            f["_id"]: f["name"] for f in faculty_collection.find(tenancy.scoped(query), {"_id": 1, "name": 1})
+        }
+        if faculty_name and not faculty_names:
+            return jsonify({"error": f"Faculty '{faculty_name}' not found"}), 404
+
+        workloads = [
+            {
+                "faculty_name": faculty_names[w["faculty_id"]],
+                "subjects": w.get("subjects", []),
+                "version": versioning.version_of(w)
+            }
+            for w in workload_collection.find(tenancy.scoped({"faculty_id": {"$in": list(faculty_names)}}))
+        ]
+
+        if not faculty_name:
+            return jsonify(workloads)
+
+        if not workloads:
+            return jsonify({"error": f"No workload saved for faculty '{faculty_name}'"}), 404
+
+        return versioning.with_etag(jsonify(workloads[0]), workloads[0]["version"])
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def save_faculty_workload(data, if_match=None):
     """
-    Save workload for a faculty by deleting previous workload and adding new one.
+    Save workload for a faculty, replacing its previous workload in place.
+    Send the version from GET as If-Match to reject the save (412) when
+    someone else saved in between.
     Expected data:
     {
         "faculty_name": "Dr. Aditi",
@@ -23,24 +76,129 @@ def save_faculty_workload(data):
     if not faculty_name or not subjects:
         return jsonify({"error": "Missing faculty_name or subjects"}), 400
 
+    subjects_error = _subjects_error(subjects)
+    if subjects_error:
+        return jsonify({"error": subjects_error}), 400
+
+    try:
+        expected = versioning.parse_if_match(if_match)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     try:
         # Get faculty ID
-        faculty = faculty_collection.find_one({"name": faculty_name})
+        faculty = faculty_collection.find_one(tenancy.scoped({"name": faculty_name}))
         if not faculty:
             return jsonify({"error": f"Faculty '{faculty_name}' not found"}), 404
 
         faculty_id = faculty.get("_id")
 
-        # Delete existing workload for this faculty
-        workload_collection.delete_many({"faculty_id": faculty_id})
+        # Replace the workload in place (compare-and-swap when If-Match is given)
+        version = versioning.save(
+            workload_collection,
+            tenancy.scoped({"faculty_id": faculty_id}),
+            {"subjects": subjects},
+            expected
+        )
 
-        # Insert new workload
-        workload_collection.insert_one({
-            "faculty_id": faculty_id,
-            "subjects": subjects
-        })
+        return versioning.with_etag(
+            jsonify({"message": f"Workload saved for faculty '{faculty_name}'", "version": version}), version
+        )
+
+    except versioning.VersionConflict as e:
+        return versioning.with_etag(
+            jsonify({"error": str(e), "current_version": e.current_version}), e.current_version
+        ), 412
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def save_bulk_faculty_workload(data):
+    """
+    Save workloads for many faculties in one request.
+    Faculty ids are resolved with a single lookup and each workload is
+    replaced in place, with its version bumped, through one unordered bulk_write.
+    Expected data:
+    {
+        "workloads": [
+            {"faculty_name": "Dr. Aditi", "subjects": [...]},
+            {"faculty_name": "Dr. Rao", "subjects": [...]}
+        ]
+    }
+    """
+    workloads = data.get("workloads")
 
-        return jsonify({"message": f"Workload saved for faculty '{faculty_name}'"})
+    if not isinstance(workloads, list) or not workloads:
+        return jsonify({"error": "Missing workloads list"}), 400
+
+    try:
+        results = [None] * len(workloads)
+        valid = []
+        seen = set()
+
+        for index, item in enumerate(workloads):
+            faculty_name = item.get("faculty_name") if isinstance(item, dict) else None
+            subjects = item.get("subjects") if isinstance(item, dict) else None
+            subjects_error = _subjects_error(subjects)
+
+            if not faculty_name or not subjects:
+                results[index] = {"index": index, "status": "error", "error": "Missing faculty_name or subjects",
+                                  "faculty_name": faculty_name if isinstance(faculty_name, str) else None}
+            elif not isinstance(faculty_name, str) or not faculty_name.strip():
+                results[index] = {"index": index, "faculty_name": None, "status": "error",
+                                  "error": "faculty_name must be a non-empty string"}
+            elif subjects_error:
+                results[index] = {"index": index, "faculty_name": faculty_name, "status": "error",
+                                  "error": subjects_error}
+            elif faculty_name in seen:
+                results[index] = {"index": index, "faculty_name": faculty_name, "status": "error",
+                                  "error": f"Faculty '{faculty_name}' is repeated in this request"}
+            else:
+                seen.add(faculty_name)
+                valid.append((index, faculty_name, subjects))
+
+        # Resolve all faculty ids at once
+        faculty_ids = {
+            f["name"]: f["_id"]
+            for f in faculty_collection.find(tenancy.scoped({"name": {"$in": list(seen)}}), {"_id": 1, "name": 1})
+        }
+
+        operations = []
+        pending = []
+        for index, faculty_name, subjects in valid:
+            faculty_id = faculty_ids.get(faculty_name)
+            if faculty_id is None:
+                results[index] = {"index": index, "faculty_name": faculty_name, "status": "error",
+                                  "error": f"Faculty '{faculty_name}' not found"}
+                continue
+            operations.append(UpdateOne(
+                tenancy.scoped({"faculty_id": faculty_id}),
+                {"$set": {"subjects": subjects, "updated_at": datetime.now()}, "$inc": {"version": 1}},
+                upsert=True
+            ))
+            pending.append((index, faculty_name))
+
+        write_errors = {}
+        if operations:
+            try:
+                workload_collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                write_errors = {err["index"]: err for err in e.details.get("writeErrors", [])}
+
+        for position, (index, faculty_name) in enumerate(pending):
+            err = write_errors.get(position)
+            if err is None:
+                results[index] = {"index": index, "faculty_name": faculty_name, "status": "saved"}
+            else:
+                results[index] = {"index": index, "faculty_name": faculty_name, "status": "error",
+                                  "error": err.get("errmsg", "Write failed")}
+
+        saved = sum(1 for r in results if r["status"] == "saved")
+        return jsonify({
+            "saved": saved,
+            "failed": len(results) - saved,
+            "results": results
+        })
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -0,0 +1,381 @@
+"""
+Performance regression suite.
+
+Times fixed workloads and compares them with a stored baseline:
+
+  solver      timetable generation on fixed synthetic instances (both backends)
+  crud        CRUD endpoints through Flask's test client on an in-memory store
+  serialise   JSON, CSV/ICS export and quality metrics of a generated timetable
+
+Each benchmark is timed --repeat times after one warm-up run; the median is
+compared with the baseline. A separate run under tracemalloc records its
+peak Python memory. Run from the Backend directory:
+
+    python perf.py --update-baseline      # record perf_baseline.json
+    python perf.py                        # exit 1 if anything regressed
+    python perf.py --ci                   # also exit 1 if the baseline is missing
+    python perf.py --only solver --repeat 3 --threshold 0.5
+
+A benchmark regresses when its median time exceeds the baseline by more than
+--threshold (and by at least --min-delta-ms, to ignore timer noise), or its
+peak memory exceeds the baseline by more than --memory-threshold. Baselines
+are machine specific; record them on the machine that runs the comparison.
+Without --ci a missing baseline (or a benchmark missing from it) is only
+reported, so a first local run succeeds; CI runs pass --ci so a lost baseline
+cannot turn the check into a no-op.
+Needs mongomock (in-memory store); the cpsat and metrics benchmarks are
+skipped when OR-Tools or NumPy are missing.
+"""
+import os
+
+os.environ.setdefault('DB_NAME', 'perf')
+os.environ.setdefault('JOB_WORKERS', '0')
+os.environ.setdefault('GENERATOR_WORKERS', '1')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import argparse
+import copy
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from bson import ObjectId
+
+try:
+    import mongomock
+except ImportError:
+    sys.exit("perf.py requires the 'mongomock' package")
+
+import config
+
+# Everything runs in this process against a private in-memory store; the
+# production connection factory is replaced before any collection is used
+_memory_client = mongomock.MongoClient()
+config.get_client = lambda: _memory_client
+
+from app import app
+from config import db
+from modules import cp_solver, timetable_generator, timetable_metrics, tenancy
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'perf_baseline.json')
+CRUD_RECORDS = 200
+
+# Fixed synthetic instances: (labs, divisions, batches per division, subjects, faculty)
+INSTANCES = {
+    'small': (2, 2, 3, 3, 3),
+    'medium': (4, 3, 4, 4, 6),
+}
+
+
+# ---------- Synthetic data ----------
+def synthetic_snapshot(labs, divisions, batches, subjects, faculty):
+    """An in-memory generator snapshot (see timetable_generator.load_snapshot) for SY"""
+    faculty_docs = [{'_id': ObjectId(f"{i + 1:024x}"), 'name': f"Faculty {i}"} for i in range(faculty)]
+    return {
+        'subjects': {'year': {'sy': [
+            {'name': f"Subject {i}", 'short_name': f"S{i}", 'hrs_per_week_practical': 2, 'hrs_per_week_lec': 3}
+            for i in range(subjects)
+        ]}},
+        'class_structure': {'sy': [{'div': chr(ord('A') + d), 'batches': batches} for d in range(divisions)]},
+        'faculty': faculty_docs,
+        'labs': [{'name': f"Lab {i}", 'short_name': f"L{i}"} for i in range(labs)],
+        'workload': [
+            # Faculty are spread over the divisions, each teaching one
+            {'faculty_id': f['_id'], 'subjects': [
+                {'year': 'SY', 'class': chr(ord('A') + i % divisions), 'practical_hrs': 2, 'lec_hrs': 3}
+            ]}
+            for i, f in enumerate(faculty_docs)
+        ],
+        'time_grid': None,
+        'availability': []
+    }
+
+
+def load_into_store(snapshot):
+    """Write a synthetic snapshot to the in-memory store for the default department"""
+    for name in tenancy.COLLECTIONS:
+        db[name].delete_many({})
+
+    stamp = tenancy.stamp
+    db['subjects'].insert_one(stamp(snapshot['subjects']))
+    db['class_structure'].insert_one(stamp(snapshot['class_structure']))
+    db['faculty'].insert_many([stamp({**f, 'short_name': f['name']}) for f in snapshot['faculty']])
+    db['labs'].insert_many([stamp(lab) for lab in snapshot['labs']])
+    db['workload'].insert_many([stamp(w) for w in snapshot['workload']])
+
+
+def _generate(snapshot, backend):
+    generator = timetable_generator.PracticalTimetableGenerator(
+        'SY', '1', backend=backend, num_workers=1, snapshot=copy.deepcopy(snapshot)
+    )
+    if not generator.generate():
+        raise RuntimeError(f"{backend} found no timetable for the benchmark instance")
+    return generator
+
+
+# ---------- Benchmarks ----------
+# Each benchmark is (name, setup) where setup() returns the callable to time.
+
+def solver_benchmarks():
+    backends = ['backtracking'] + (['cpsat'] if cp_solver.is_available() else [])
+    benchmarks = []
+    for instance, sizes in INSTANCES.items():
+        snapshot = synthetic_snapshot(*sizes)
+        for backend in backends:
+            benchmarks.append((
+                f"solver.{backend}.{instance}",
+                lambda snapshot=snapshot, backend=backend: (lambda: _generate(snapshot, backend))
+            ))
+        benchmarks.append((
+            f"solver.feasibility.{instance}",
+            lambda snapshot=snapshot: (lambda: timetable_generator.PracticalTimetableGenerator(
+                'SY', '1', snapshot=copy.deepcopy(snapshot)).check_feasibility())
+        ))
+    return benchmarks
+
+
+def _request(client, method, path, expected=200, **kwargs):
+    response = client.open(path, method=method, **kwargs)
+    if response.status_code != expected:
+        raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def crud_benchmarks():
+    client = app.test_client()
+    names = [f"Perf {i}" for i in range(CRUD_RECORDS)]
+    records = [{'name': name, 'short_name': f"P{i}"} for i, name in enumerate(names)]
+
+    def empty_store():
+        load_into_store(synthetic_snapshot(*INSTANCES['medium']))
+
+    def with_records():
+        empty_store()
+        _request(client, 'POST', '/api/faculty/bulk', json={'action': 'add', 'faculties': records})
+
+    def add_one_by_one():
+        empty_store()
+        return lambda: [
+            _request(client, 'POST', '/api/faculty', json={'action': 'add', **record}) for record in records
+        ]
+
+    def bulk_add():
+        empty_store()
+        return lambda: _request(client, 'POST', '/api/labs/bulk', json={'action': 'add', 'labs': records})
+
+    def list_faculty():
+        with_records()
+        return lambda: [_request(client, 'GET', '/api/faculty') for _ in range(50)]
+
+    def bulk_update():
+        with_records()
+        updates = [{'name': name, 'updates': {'short_name': 'U'}} for name in names]
+        return lambda: _request(client, 'POST', '/api/faculty/bulk', json={'action': 'update', 'faculties': updates})
+
+    def bulk_workload():
+        with_records()
+        workloads = [{'faculty_name': name, 'subjects': [{'year': 'SY', 'class': 'A', 'practical_hrs': 2}]}
+                     for name in names]
+        return lambda: _request(client, 'POST', '/api/faculty_workload/bulk', json={'workloads': workloads})
+
+    def save_subjects():
+        empty_store()
+        subjects = synthetic_snapshot(*INSTANCES['medium'])['subjects']
+
+        def run():
+            for _ in range(50):
+                etag = _request(client, 'GET', '/api/subjects').headers['ETag']
+                _request(client, 'POST', '/api/subjects', json=subjects, headers={'If-Match': etag})
+        return run
+
+    return [
+        (f"crud.faculty_add_x{CRUD_RECORDS}", add_one_by_one),
+        (f"crud.labs_bulk_add_{CRUD_RECORDS}", bulk_add),
+        ("crud.faculty_list_x50", list_faculty),
+        (f"crud.faculty_bulk_update_{CRUD_RECORDS}", bulk_update),
+        (f"crud.workload_bulk_save_{CRUD_RECORDS}", bulk_workload),
+        ("crud.subjects_get_save_x50", save_subjects),
+    ]
+
+
+def serialise_benchmarks():
+    client = app.test_client()
+    snapshot = synthetic_snapshot(*INSTANCES['medium'])
+    state = {}
+
+    def stored_timetable():
+        if 'timetable' not in state:
+            state['timetable'] = _generate(snapshot, 'backtracking').timetable
+        load_into_store(snapshot)
+        db['master_lab_timetable'].insert_one(
+            tenancy.stamp({'year': 'SY', 'semester': '1', 'schedule': state['timetable']})
+        )
+        return state['timetable']
+
+    def to_json():
+        timetable = stored_timetable()
+        return lambda: [json.dumps(timetable, default=str) for _ in range(50)]
+
+    def get_endpoint():
+        stored_timetable()
+        return lambda: [
+            _request(client, 'POST', '/api/master_timetable', json={'year': 'SY', 'sem': '1'}) for _ in range(50)
+        ]
+
+    def export(file_format):
+        def setup():
+            stored_timetable()
+            return lambda: [
+                _request(client, 'GET', f"/api/export/{file_format}?year=SY&sem=1&view=lab").get_data()
+                for _ in range(20)
+            ]
+        return setup
+
+    def metrics():
+        timetable = stored_timetable()
+        return lambda: [timetable_metrics.score_schedule(timetable) for _ in range(50)]
+
+    benchmarks = [
+        ("serialise.json_dumps_x50", to_json),
+        ("serialise.master_timetable_get_x50", get_endpoint),
+        ("serialise.export_csv_x20", export('csv')),
+        ("serialise.export_ics_x20", export('ics')),
+    ]
+    if timetable_metrics.np is not None:
+        benchmarks.append(("serialise.metrics_x50", metrics))
+    return benchmarks
+
+
+SUITES = {
+    'solver': solver_benchmarks,
+    'crud': crud_benchmarks,
+    'serialise': serialise_benchmarks,
+}
+
+
+# ---------- Measurement ----------
+def measure(setup, repeat):
+    """Median/min wall time over repeat runs (after one warm-up) and tracemalloc peak of one run"""
+    setup()()
+
+    times = []
+    for _ in range(repeat):
+        run = setup()
+        started = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - started)
+
+    run = setup()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'min_ms': round(min(times) * 1000, 3),
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+
+def compare(name, result, baseline, args):
+    """Return a list of regression messages for one benchmark"""
+    if baseline is None:
+        return []
+
+    problems = []
+    allowed_ms = baseline['median_ms'] * (1 + args.threshold)
+    if result['median_ms'] > allowed_ms and result['median_ms'] - baseline['median_ms'] >= args.min_delta_ms:
+        problems.append(f"{name}: time {result['median_ms']:.1f} ms vs baseline {baseline['median_ms']:.1f} ms")
+
+    allowed_kb = baseline['peak_kb'] * (1 + args.memory_threshold)
+    if result['peak_kb'] > allowed_kb and result['peak_kb'] - baseline['peak_kb'] >= args.min_delta_kb:
+        problems.append(f"{name}: peak memory {result['peak_kb']:.0f} KB vs baseline {baseline['peak_kb']:.0f} KB")
+
+    return problems
+
+
+def _change(value, base):
+    if not base:
+        return ''
+    return f"{(value - base) / base * 100:+.0f}%"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="baseline JSON file")
+    parser.add_argument('--update-baseline', action='store_true', help="record the results as the new baseline")
+    parser.add_argument('--only', action='append', choices=list(SUITES), help="run only these suites")
+    parser.add_argument('--filter', default='', help="run only benchmarks whose name contains this text")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help="allowed relative memory growth")
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help="ignore slowdowns smaller than this")
+    parser.add_argument('--min-delta-kb', type=float, default=64.0, help="ignore memory growth smaller than this")
+    parser.add_argument('--json', action='store_true', help="print the results as JSON")
+    parser.add_argument('--ci', action='store_true',
+                        help="fail when the baseline is missing or lacks a benchmark that ran")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f).get('results', {})
+
+    results, problems = {}, []
+    print(f"{'benchmark':<40}{'median ms':>12}{'min ms':>10}{'peak KB':>10}{'vs base':>10}")
+    for suite in args.only or list(SUITES):
+        for name, setup in SUITES[suite]():
+            if args.filter not in name:
+                continue
+            result = measure(setup, args.repeat)
+            results[name] = result
+            base = baseline.get(name)
+            problems += compare(name, result, base, args)
+            print(f"{name:<40}{result['median_ms']:>12.1f}{result['min_ms']:>10.1f}{result['peak_kb']:>10.0f}"
+                  f"{_change(result['median_ms'], base and base['median_ms']):>10}")
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+    if args.update_baseline:
+        # Keep entries of benchmarks that were not run this time
+        recorded = {**baseline, **results}
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'python': platform.python_version(),
+                'machine': platform.platform(),
+                'repeat': args.repeat,
+                'results': recorded
+            }, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --update-baseline to record one")
+        return 1 if args.ci else 0
+
+    missing = sorted(set(results) - set(baseline))
+    if missing:
+        print(f"\nNot in baseline: {', '.join(missing)}")
+        if args.ci:
+            return 1
+
+    if problems:
+        print(f"\n{len(problems)} regression(s):")
+        for problem in problems:
+            print(f"  {problem}")
+        return 1
+
+    print("\nNo regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Cross-check the solvers on one fixed instance.
+
+The single backtracking search, the decomposed (per-component) search and
+CP-SAT must each produce a timetable without faculty, lab or batch clashes
+that respects the blackouts and staffs every batch exactly as the workload
+says. Runs against an in-memory store; the CP-SAT case is skipped when
+OR-Tools is not installed. Run from the Backend directory:
+
+    python -m pytest tests
+"""
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DB_NAME', 'solver_tests')
+os.environ.setdefault('JOB_WORKERS', '0')
+os.environ.setdefault('GENERATOR_WORKERS', '1')  # components are solved in-process
+
+import config  # noqa: E402
+
+_client = mongomock.MongoClient()
+config.get_client = lambda: _client
+
+from modules import cp_solver, timetable_generator  # noqa: E402
+
+DEPARTMENT = 'solver-tests'
+DIVISIONS = {'A': ['Dr. A1', 'Dr. A2'], 'B': ['Dr. B1', 'Dr. B2']}
+BATCHES = 2
+SUBJECTS = [
+    {'name': 'Data Structures', 'short_name': 'DS', 'hrs_per_week_practical': 2, 'hrs_per_week_lec': 3},
+    {'name': 'Databases', 'short_name': 'DB', 'hrs_per_week_practical': 2, 'hrs_per_week_lec': 3},
+    {'name': 'Networks', 'short_name': 'CN', 'hrs_per_week_practical': 4, 'hrs_per_week_lec': 3},
+    {'name': 'Mathematics', 'short_name': 'M', 'hrs_per_week_practical': 0, 'hrs_per_week_lec': 4},
+]
+LABS = ['Lab 1', 'Lab 2', 'Lab 3']
+LECTURE_ONLY = 'Dr. Lecturer'  # division A, no practical hours: must never staff a lab
+BLACKOUTS = [
+    {'resource_type': 'lab', 'name': 'Lab 3', 'unavailable': [{'day': 'Monday'}]},
+    {'resource_type': 'faculty', 'name': 'Dr. A1', 'unavailable': [{'day': 'Tuesday', 'slot': '11:15'}]},
+]
+
+
+@pytest.fixture(scope='module')
+def snapshot():
+    db = config.get_db()
+    scope = {'department': DEPARTMENT}
+
+    db['subjects'].insert_one({**scope, 'year': {'sy': SUBJECTS}})
+    db['class_structure'].insert_one({**scope, 'sy': [{'div': div, 'batches': BATCHES} for div in DIVISIONS]})
+    db['labs'].insert_many([{**scope, 'name': name, 'short_name': name.replace(' ', '')} for name in LABS])
+    db['availability'].insert_many([{**scope, **calendar} for calendar in BLACKOUTS])
+
+    staff = [(name, div, 2) for div, names in DIVISIONS.items() for name in names] + [(LECTURE_ONLY, 'A', 0)]
+    for name, div, practical_hrs in staff:
+        faculty_id = db['faculty'].insert_one({**scope, 'name': name, 'short_name': name[-2:]}).inserted_id
+        db['workload'].insert_one({**scope, 'faculty_id': faculty_id, 'subjects': [
+            {'year': 'SY', 'class': div, 'practical_hrs': practical_hrs, 'lec_hrs': 3}
+        ]})
+
+    return timetable_generator.load_snapshot(DEPARTMENT)
+
+
+def _generator(snapshot, backend='backtracking'):
+    return timetable_generator.PracticalTimetableGenerator(
+        'SY', '1', backend=backend, time_limit=20, num_workers=2, snapshot=snapshot, department=DEPARTMENT
+    )
+
+
+def _entries(timetable):
+    """Every occupied (lab, day, slot, entry) of a generated timetable"""
+    for lab, days in timetable['labs'].items():
+        for day, slots in days.items():
+            for slot, entries in slots.items():
+                for entry in entries:
+                    yield lab, day, slot, entry
+
+
+def assert_valid(timetable):
+    entries = list(_entries(timetable))
+
+    labs_used = Counter((lab, day, slot) for lab, day, slot, _ in entries)
+    assert max(labs_used.values()) == 1, "lab clash"
+
+    faculty_used = Counter((entry['faculty'], day, slot) for _, day, slot, entry in entries)
+    assert max(faculty_used.values()) == 1, "faculty clash"
+
+    batches_used = Counter((entry['division'], entry['batch'], day, slot) for _, day, slot, entry in entries)
+    assert max(batches_used.values()) == 1, "batch clash"
+
+    for lab, day, slot, entry in entries:
+        assert not (lab == 'Lab 3' and day == 'Monday'), "lab blackout ignored"
+        assert not (entry['faculty'] == 'Dr. A1' and (day, slot) == ('Tuesday', '11:15')), "faculty blackout ignored"
+        # Staffing follows the workload: only practical staff of the batch's division
+        assert entry['faculty'] in DIVISIONS[entry['division']], f"{entry['faculty']} is not staffed for {entry['division']}"
+
+    periods = Counter((entry['division'], entry['batch'], entry['subject']) for _, _, _, entry in entries)
+    expected = {
+        (div, batch, subject['short_name']): subject['hrs_per_week_practical'] // timetable_generator.HOURS_PER_SLOT
+        for div in DIVISIONS
+        for batch in range(1, BATCHES + 1)
+        for subject in SUBJECTS
+        if subject['hrs_per_week_practical'] >= timetable_generator.MIN_PRACTICAL_HOURS
+    }
+    assert dict(periods) == expected, "every batch gets exactly its practical hours"
+
+
+def test_single_backtracking_search(snapshot):
+    generator = _generator(snapshot)
+    batch_assignments, labs, faculties, faculty_subjects_map = generator._prepare_inputs()
+    generator._initialize_timetable(labs)
+
+    assert generator._backtrack_assign(batch_assignments, labs, faculties, faculty_subjects_map, 0)
+    assert_valid(generator.timetable)
+
+
+def test_decomposed_search(snapshot):
+    generator = _generator(snapshot)
+    batch_assignments, _, faculties, faculty_subjects_map = generator._prepare_inputs()
+    # Each division has its own staff, so the instance splits into one component per division
+    assert len(generator._decompose(batch_assignments, faculties, faculty_subjects_map)) == len(DIVISIONS)
+
+    timetable = _generator(snapshot).generate()
+    assert timetable is not None
+    assert_valid(timetable)
+
+
+@pytest.mark.skipif(not cp_solver.is_available(), reason="OR-Tools is not installed")
+def test_cpsat(snapshot):
+    generator = _generator(snapshot, backend='cpsat')
+    timetable = generator.generate()
+
+    assert timetable is not None, generator.solver_stats
+    assert generator.solver_stats['status'] in ('OPTIMAL', 'FEASIBLE')
+    assert_valid(timetable)
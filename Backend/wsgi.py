@@ -0,0 +1,12 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+Timetable generation runs in the job pool (modules/job_runner.py), so the
+threads of each Gunicorn worker keep serving CRUD and read requests while a
+search is in progress.
+"""
+from app import app
+
+application = app